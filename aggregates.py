@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+赛道聚合指标计算
+
+纯计算函数接收DataFrame；get_* 函数从数据加载层取数并按数据版本缓存，
+供仪表板页面和启动预热共用。
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_loader import MONTH_COLUMNS, load_summary_data, load_track_summaries, memoize_by_data_version
+from formatting import format_growth_rate, format_number, parse_growth_rates
+
+# 重点赛道（侧边栏中单独成页）
+KEY_TRACKS = ["AI Chatbot", "AI虚拟陪伴", "AI编程", "AI音频", "AI视频"]
+
+# 增速分位数指标；均值易被极端增速拉高，中位数和P90更能反映整体分布
+GROWTH_QUANTILES = {'增速中位数': 0.5, '增速P90': 0.9}
+
+
+def calculate_growth_quantiles(growth_rates):
+    """增速分位数（不含缺失增速）
+
+    取累计占比不小于q的最小增速（inverted_cdf），与分块聚合中KLL草图未压缩时的结果一致。
+    """
+    values = pd.to_numeric(growth_rates, errors='coerce').dropna().to_numpy(dtype=np.float64)
+    if values.size == 0:
+        return {name: np.nan for name in GROWTH_QUANTILES}
+    estimates = np.quantile(values, list(GROWTH_QUANTILES.values()), method='inverted_cdf')
+    return dict(zip(GROWTH_QUANTILES, estimates))
+
+
+def calculate_track_aggregates(df):
+    """按赛道聚合：工具数量、6月总访问量、半年总增量、平均增速、增速中位数（数值，按6月访问量降序）"""
+    # 按赛道聚合数据
+    track_summary = df.groupby('赛道分类').agg({
+        'Tools名称': 'count',
+        '2025年6月访问量': 'sum',
+        '半年访问增量': 'sum',
+        '2025H1访问量增速': lambda x: parse_growth_rates(x).mean()
+    })
+    track_summary.columns = ['工具数量', '6月总访问量', '半年总增量', '平均增速']
+    track_summary['增速中位数'] = df.groupby('赛道分类')['2025H1访问量增速'].agg(
+        lambda x: calculate_growth_quantiles(parse_growth_rates(x))['增速中位数'])
+    track_summary = track_summary.round(1)
+
+    # 按6月访问量排序
+    return track_summary.sort_values('6月总访问量', ascending=False)
+
+def create_track_overview_table(df):
+    """创建赛道概览表格"""
+    return format_track_overview(calculate_track_aggregates(df))
+
+def format_track_overview(track_summary):
+    """将赛道聚合数值格式化为概览展示表"""
+    track_summary = track_summary.copy()
+
+    # 保存原始数值用于排序和计算
+    track_summary['6月总访问量_原始'] = track_summary['6月总访问量']
+    track_summary['半年总增量_原始'] = track_summary['半年总增量']
+
+    # 格式化显示
+    track_summary['工具数量'] = track_summary['工具数量'].apply(lambda x: f"{x:,}")
+    track_summary['6月总访问量'] = track_summary['6月总访问量'].apply(lambda x: format_number(x))
+    track_summary['半年总增量'] = track_summary['半年总增量'].apply(lambda x: format_number(x))
+    track_summary['平均增速'] = track_summary['平均增速'].apply(lambda x: format_number(x, is_percentage=True))
+    track_summary['增速中位数'] = track_summary['增速中位数'].apply(lambda x: format_number(x, is_percentage=True))
+
+    return track_summary
+
+def calculate_track_mom_growth(track_summary_df):
+    """基于赛道总和数据计算MoM增长率"""
+    if track_summary_df.empty:
+        return pd.DataFrame()
+
+    # 计算每月的MoM增长率（5个月环比）
+    mom_data = []
+
+    for _, row in track_summary_df.iterrows():
+        track_name = row.get('赛道分类', '未知赛道')
+        mom_row = {'赛道分类': track_name}
+
+        # 计算5个月的环比增长率
+        for i in range(1, len(MONTH_COLUMNS)):
+            current_month = MONTH_COLUMNS[i]
+            previous_month = MONTH_COLUMNS[i-1]
+
+            current_value = row.get(current_month, 0)
+            previous_value = row.get(previous_month, 0)
+
+            # 计算MoM增长率
+            if previous_value > 0:
+                growth_rate = ((current_value - previous_value) / previous_value) * 100
+            else:
+                growth_rate = 0 if current_value == 0 else 100
+
+            # 月份名称（如：2月MoM、3月MoM等）
+            month_num = i + 1
+            mom_col_name = f"{month_num}月MoM"
+            mom_row[mom_col_name] = round(growth_rate, 1)
+
+        mom_data.append(mom_row)
+
+    return pd.DataFrame(mom_data)
+
+def summarize_track_months(df):
+    """按赛道汇总各月访问量，结构与赛道总和行相同，可直接用于 calculate_mom_matrix()"""
+    return df.groupby('赛道分类', sort=False)[MONTH_COLUMNS].sum().reset_index()
+
+def calculate_mom_matrix(track_summary_df):
+    """计算热力图用的MoM矩阵，附带总访问量并按总访问量升序排列"""
+    if track_summary_df.empty:
+        return pd.DataFrame()
+
+    track_summary_df = track_summary_df.copy()
+
+    # 计算总访问量（6个月总和）
+    track_summary_df['总访问量'] = track_summary_df[MONTH_COLUMNS].sum(axis=1)
+
+    # 计算MoM增长率
+    mom_df = calculate_track_mom_growth(track_summary_df)
+
+    if mom_df.empty:
+        return mom_df
+
+    # 将总访问量信息添加到MoM数据中
+    track_summary_df_indexed = track_summary_df.set_index('赛道分类')
+    mom_df = mom_df.set_index('赛道分类')
+    mom_df['总访问量'] = track_summary_df_indexed['总访问量']
+
+    # 按总访问量降序排序（访问量高的在上面）
+    # 注意：由于Plotly热力图从下往上显示，所以要用ascending=True让高访问量显示在顶部
+    return mom_df.sort_values('总访问量', ascending=True)
+
+def calculate_overall_metrics(df):
+    """计算核心指标：工具总数、6月总访问量、半年总增量、平均增速、增速中位数/P90"""
+    growth_rates = parse_growth_rates(df['2025H1访问量增速'])
+    return {
+        '工具总数': len(df),
+        '6月总访问量': df['2025年6月访问量'].sum(),
+        '半年总增量': df['半年访问增量'].sum(),
+        '平均增速': growth_rates.mean(),
+        **calculate_growth_quantiles(growth_rates),
+    }
+
+def calculate_monthly_mom_rates(track_data):
+    """计算赛道总体各月环比增速（2月~6月）"""
+    # 计算赛道总体的月度访问量
+    track_monthly_totals = [track_data[col].sum() for col in MONTH_COLUMNS]
+
+    # 计算环比增速
+    mom_rates = []
+    for i in range(1, len(track_monthly_totals)):
+        if track_monthly_totals[i-1] > 0:
+            mom_rate = ((track_monthly_totals[i] - track_monthly_totals[i-1]) / track_monthly_totals[i-1]) * 100
+        else:
+            mom_rate = 0
+        mom_rates.append(mom_rate)
+
+    return mom_rates
+
+def get_track_data(df, track_name):
+    """筛选单个赛道的数据"""
+    return df[df['赛道分类'] == track_name].copy()
+
+def get_other_tracks(df):
+    """获取重点赛道以外的赛道列表（不含"其他"）"""
+    return [track for track in df['赛道分类'].unique()
+            if track not in KEY_TRACKS and track != "其他"]
+
+def select_top_tools(track_data, top_n=10, sort_column='2025年6月访问量'):
+    """按指定列选出TOP N工具（数值）"""
+    return track_data.nlargest(top_n, sort_column)[
+        ['Tools名称', '2025年6月访问量', '半年访问增量', '2025H1访问量增速']
+    ].copy()
+
+def create_top_tools_table(track_data, top_n=10):
+    """按6月访问量生成TOP N工具展示表"""
+    top_tools = select_top_tools(track_data, top_n)
+
+    # 格式化数据显示
+    top_tools['6月访问量'] = top_tools['2025年6月访问量'].apply(lambda x: format_number(x))
+    top_tools['半年增量'] = top_tools['半年访问增量'].apply(lambda x: format_number(x))
+    top_tools['增长率'] = top_tools['2025H1访问量增速'].apply(lambda x: format_growth_rate(x))
+
+    # 重置索引并添加排名
+    display_df = top_tools[['Tools名称', '6月访问量', '半年增量', '增长率']].copy()
+    display_df.reset_index(drop=True, inplace=True)
+    display_df.index = display_df.index + 1
+
+    return display_df
+
+
+def _parallel_aggregation():
+    """启用多进程分片聚合（TOOLIFY_AGGREGATION_WORKERS > 1）时返回聚合状态，否则返回None"""
+    from parallel_aggregation import get_parallel_aggregation, is_parallel_enabled
+    return get_parallel_aggregation() if is_parallel_enabled() else None
+
+
+@memoize_by_data_version(persist=True)
+def get_overall_metrics():
+    """总览页核心指标（按数据版本缓存）"""
+    aggregation = _parallel_aggregation()
+    if aggregation is not None:
+        from ingest import aggregation_to_overall_metrics
+        return aggregation_to_overall_metrics(aggregation)
+    return calculate_overall_metrics(load_summary_data())
+
+@memoize_by_data_version(persist=True)
+def get_track_aggregates():
+    """各赛道聚合数值（按数据版本缓存）"""
+    aggregation = _parallel_aggregation()
+    if aggregation is not None:
+        from ingest import aggregation_to_track_table
+        return aggregation_to_track_table(aggregation)
+    return calculate_track_aggregates(load_summary_data())
+
+@memoize_by_data_version(persist=True)
+def get_track_overview():
+    """赛道概览表（按数据版本缓存）"""
+    return format_track_overview(get_track_aggregates())
+
+@memoize_by_data_version(persist=True)
+def get_mom_matrix():
+    """各赛道MoM矩阵（按数据版本缓存）"""
+    aggregation = _parallel_aggregation()
+    if aggregation is not None:
+        from ingest import aggregation_to_track_summaries
+        return calculate_mom_matrix(aggregation_to_track_summaries(aggregation))
+    return calculate_mom_matrix(load_track_summaries())
+
+@memoize_by_data_version
+def get_track_metrics(track_name):
+    """赛道详情页核心指标（按数据版本缓存）"""
+    aggregation = _parallel_aggregation()
+    if aggregation is not None:
+        from ingest import aggregation_to_track_metrics
+        return aggregation_to_track_metrics(aggregation, track_name)
+    return calculate_overall_metrics(get_track_data(load_summary_data(), track_name))
+
+@memoize_by_data_version
+def get_top_tools_table(track_name, top_n=10):
+    """赛道TOP N工具展示表（按数据版本缓存）"""
+    return create_top_tools_table(get_top_tools(track_name, top_n), top_n)
+
+@memoize_by_data_version
+def get_top_tools(track_name, top_n=10, sort_column='2025年6月访问量'):
+    """赛道TOP N工具数值（按数据版本缓存）；超出聚合状态保留的K时回退到整表计算"""
+    aggregation = _parallel_aggregation()
+    if aggregation is not None and top_n <= aggregation['top']['k']:
+        from ingest import aggregation_top_tools
+        return select_top_tools(aggregation_top_tools(aggregation, track_name, top_n, sort_column), top_n, sort_column)
+    return select_top_tools(get_track_data(load_summary_data(), track_name), top_n, sort_column)
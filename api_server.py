@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+赛道聚合数据的本地JSON接口
+
+直接读取按数据版本缓存的聚合结果，不经过Streamlit脚本执行。
+请求先校验并规范化为路由（未知路径、赛道和参数直接返回404/400），
+响应体按 (数据版本, 路由) 预先序列化并缓存，附带强ETag；
+客户端带 If-None-Match 轮询时，数据未变化只返回304，几乎没有开销。
+
+    python api_server.py --port 8502
+
+接口：
+    GET /api/version                      当前数据版本
+    GET /api/metrics                      总览核心指标
+    GET /api/overview                     赛道概览表
+    GET /api/mom                          各赛道月度环比增长率矩阵
+    GET /api/tracks                       赛道列表
+    GET /api/tracks/<赛道>/top?n=10&by=visits|increment   赛道TOP N工具
+"""
+
+import argparse
+import hashlib
+import json
+import math
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from aggregates import get_mom_matrix, get_overall_metrics, get_top_tools, get_track_aggregates
+from data_loader import get_data_version, memoize_by_data_version
+
+# TOP N 排序字段
+TOP_SORT_COLUMNS = {'visits': '2025年6月访问量', 'increment': '半年访问增量'}
+MAX_TOP_N = 100
+
+
+class NotFound(Exception):
+    """请求的资源不存在"""
+
+
+def _clean_value(value):
+    """将numpy标量和NaN转换为JSON可表示的值"""
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _records(df, index_name=None):
+    """DataFrame转为记录列表；index_name不为空时把索引作为一列输出"""
+    if index_name is not None:
+        df = df.reset_index().rename(columns={df.index.name or 'index': index_name})
+    return [{key: _clean_value(value) for key, value in row.items()} for row in df.to_dict(orient='records')]
+
+
+# 无参数的接口
+SIMPLE_ROUTES = ('version', 'metrics', 'overview', 'mom', 'tracks')
+
+
+def parse_request(path, query):
+    """校验并规范化请求，返回路由元组：(接口,) 或 ('top', 赛道, N, 排序字段)
+
+    未知路径和不存在的赛道抛出 NotFound，参数错误抛出 ValueError；
+    只有规范化后的路由参与响应缓存的key，无效请求不会进入缓存。
+    """
+    parts = [unquote(part) for part in path.strip('/').split('/')]
+    if parts[:1] != ['api']:
+        raise NotFound(path)
+    parts = parts[1:]
+
+    if len(parts) == 1 and parts[0] in SIMPLE_ROUTES:
+        return (parts[0],)
+
+    if len(parts) == 3 and parts[0] == 'tracks' and parts[2] == 'top':
+        track_name = parts[1]
+        if track_name not in get_track_aggregates().index:
+            raise NotFound(track_name)
+        try:
+            top_n = int(query.get('n', '10'))
+        except ValueError:
+            raise ValueError(f"n 必须是整数: {query.get('n')}")
+        top_n = min(max(top_n, 1), MAX_TOP_N)
+        sort_key = query.get('by', 'visits')
+        if sort_key not in TOP_SORT_COLUMNS:
+            raise ValueError(f"不支持的排序字段: {sort_key}")
+        return ('top', track_name, top_n, sort_key)
+
+    raise NotFound(path)
+
+
+def build_payload(route):
+    """根据规范化后的路由生成响应数据"""
+    if route == ('version',):
+        return {'data_version': get_data_version()}
+    if route == ('metrics',):
+        return {key: _clean_value(value) for key, value in get_overall_metrics().items()}
+    if route == ('overview',):
+        return _records(get_track_aggregates(), index_name='赛道分类')
+    if route == ('mom',):
+        return _records(get_mom_matrix(), index_name='赛道分类')
+    if route == ('tracks',):
+        return get_track_aggregates().index.tolist()
+
+    _, track_name, top_n, sort_key = route
+    return _records(get_top_tools(track_name, top_n, TOP_SORT_COLUMNS[sort_key]))
+
+
+@memoize_by_data_version
+def get_response(route):
+    """序列化后的响应体及其ETag（按数据版本和规范化后的路由缓存）"""
+    payload = build_payload(route)
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    etag = f'"{get_data_version()}-{hashlib.sha1(body).hexdigest()[:16]}"'
+    return body, etag
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match是否命中ETag：按弱比较忽略 W/ 前缀，"*" 匹配任意资源"""
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*':
+            return True
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+class AggregateApiHandler(BaseHTTPRequestHandler):
+    """处理聚合数据请求"""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        try:
+            body, etag = get_response(parse_request(url.path, query))
+        except NotFound:
+            self._send_json(404, {'error': f'未找到: {url.path}'})
+            return
+        except ValueError as e:
+            self._send_json(400, {'error': f'参数错误: {e}'})
+            return
+        except Exception as e:
+            self._send_json(500, {'error': str(e)})
+            return
+
+        if etag_matches(self.headers.get('If-None-Match', ''), etag):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 304轮询请求较多，只记录非304响应
+        if len(args) > 1 and str(args[1]) == '304':
+            return
+        super().log_message(format, *args)
+
+
+def run_server(host='127.0.0.1', port=8502):
+    """启动JSON接口服务"""
+    server = ThreadingHTTPServer((host, port), AggregateApiHandler)
+    print(f"聚合数据接口已启动: http://{host}:{port}/api/overview")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="赛道聚合数据JSON接口")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8502, help="监听端口")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run_server(args.host, args.port)
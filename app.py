@@ -1,11 +1,31 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import numpy as np
-import os
-from pathlib import Path
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import memory_diagnostics
+
+from aggregates import (
+    KEY_TRACKS,
+    calculate_overall_metrics,
+    create_top_tools_table,
+    create_track_overview_table,
+    format_track_overview,
+    get_other_tracks,
+    get_overall_metrics,
+    get_top_tools_table,
+    get_track_metrics,
+    get_track_overview,
+)
+from data_loader import get_ingest_source, load_summary_data
+from filter_index import filter_positions, get_filter_index, get_filtered_data, make_filters
+from formatting import format_number
+from prefetch import record_navigation, schedule_prefetch
+from rank_index import MAX_SUGGESTIONS, create_tool_rank_table, get_rank_index, lookup_tool_ranks, search_tools
+from similarity import create_similar_tools_table, find_similar_tools, get_similarity_index
+from warmup import get_startup_report
+
+# Plotly体积较大，首屏（页面配置、样式、侧边栏）不需要，
+# 由 charts 模块在首次绘图时导入，见 render_* 函数
 
 # 页面配置
 st.set_page_config(
@@ -200,75 +220,39 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
+# 筛选控件：6月访问量门槛和增速滑块范围
+VISIT_THRESHOLDS = [0, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000]
+GROWTH_SLIDER_RANGE = (-100, 500)
+
+# 侧边栏导航页面及图标
+NAV_PAGES = {
+    '总览': '📊',
+    'AI Chatbot': '💬',
+    'AI虚拟陪伴': '🤗',
+    'AI编程': '💻',
+    'AI音频': '🎵',
+    'AI视频': '🎬',
+    '其他赛道': '🔍',
+    '数据变化': '🔄'
+}
+
+# 重点赛道页面标题图标
+TRACK_ICONS = {
+    "AI Chatbot": "💬",
+    "AI虚拟陪伴": "🤗", 
+    "AI编程": "💻",
+    "AI音频": "🎵",
+    "AI视频": "🎬"
+}
+
 def load_data():
-    """加载和预处理数据"""
+    """加载和预处理数据（按数据版本缓存，见 data_loader）"""
     try:
-        # 读取主数据文件
-        df = pd.read_excel('toolify_processed_2025_summary.xlsx')
-        
-        # 确保数据类型正确
-        month_columns = ['2025年1月访问量', '2025年2月访问量', '2025年3月访问量', 
-                        '2025年4月访问量', '2025年5月访问量', '2025年6月访问量']
-        
-        for col in month_columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-        
-        # 确保增量列也是数值型
-        df['半年访问增量'] = pd.to_numeric(df['半年访问增量'], errors='coerce').fillna(0)
-        
-        return df
+        return load_summary_data()
     except Exception as e:
         st.error(f"数据加载失败: {str(e)}")
         return pd.DataFrame()
 
-
-
-def format_number(num, is_percentage=False):
-    """统一的数字格式化函数"""
-    if pd.isna(num) or num == 0:
-        return "0" if not is_percentage else "0.0%"
-    
-    if is_percentage:
-        return f"{num:.1f}%"
-    else:
-        # 访问量和增量使用千分位，不保留小数，统一使用B、M、K格式
-        # 处理负数
-        is_negative = num < 0
-        abs_num = abs(num)
-        
-        if abs_num >= 1e9:
-            formatted = f"{abs_num/1e9:.1f}B"
-        elif abs_num >= 1e6:
-            formatted = f"{abs_num/1e6:.1f}M"
-        elif abs_num >= 1e3:
-            formatted = f"{abs_num/1e3:.0f}K"
-        else:
-            # 小于1000的数字显示完整数字
-            formatted = f"{abs_num:.0f}"
-        
-        # 添加负号
-        return f"-{formatted}" if is_negative else formatted
-
-def format_growth_rate(rate_str):
-    """格式化增长率字符串"""
-    if pd.isna(rate_str) or rate_str == 'N/A':
-        return "0.0%"
-    
-    if isinstance(rate_str, str):
-        # 移除百分号并转换为数字
-        clean_rate = rate_str.replace('%', '').strip()
-        try:
-            rate_num = float(clean_rate)
-            return f"{rate_num:.1f}%"
-        except:
-            return "0.0%"
-    else:
-        try:
-            return f"{float(rate_str):.1f}%"
-        except:
-            return "0.0%"
-
 def create_sidebar_navigation():
     """创建侧边栏导航"""
     st.sidebar.markdown("""
@@ -281,25 +265,17 @@ def create_sidebar_navigation():
     # 初始化会话状态
     if 'current_page' not in st.session_state:
         st.session_state.current_page = '总览'
-    
-    # 定义页面结构
-    pages = {
-        '总览': '📊',
-        'AI Chatbot': '💬',
-        'AI虚拟陪伴': '🤗',
-        'AI编程': '💻',
-        'AI音频': '🎵',
-        'AI视频': '🎬',
-        '其他赛道': '🔍'
-    }
+        record_navigation(None, '总览')
     
     st.sidebar.markdown('<div class="nav-section-title">核心页面</div>', unsafe_allow_html=True)
     
     # 创建导航按钮
-    for page_name, icon in pages.items():
+    for page_name, icon in NAV_PAGES.items():
         button_class = "nav-button active" if st.session_state.current_page == page_name else "nav-button"
         
         if st.sidebar.button(f"{icon} {page_name}", key=f"nav_{page_name}", use_container_width=True):
+            if page_name != st.session_state.current_page:
+                record_navigation(st.session_state.current_page, page_name)
             st.session_state.current_page = page_name
             st.rerun()
     
@@ -323,332 +299,145 @@ def create_sidebar_navigation():
     
     return st.session_state.current_page
 
-def load_track_summary_data():
-    """从各赛道Excel文件读取第一行总和数据"""
-    track_data_dir = "data/2025H1"
-    track_summary_data = []
-    
-    if not os.path.exists(track_data_dir):
-        return pd.DataFrame()
-    
-    # 遍历所有Excel文件
-    for filename in os.listdir(track_data_dir):
-        if filename.startswith("2025H1") and filename.endswith(".xlsx") and "processed" not in filename:
-            try:
-                file_path = os.path.join(track_data_dir, filename)
-                # 读取Excel文件
-                track_df = pd.read_excel(file_path)
-                
-                if len(track_df) > 0:
-                    # 获取第一行（总和行）数据
-                    summary_row = track_df.iloc[0].copy()
-                    track_summary_data.append(summary_row)
-                    
-            except Exception as e:
-                print(f"读取文件 {filename} 时出错: {e}")
-                continue
-    
-    if track_summary_data:
-        return pd.DataFrame(track_summary_data)
-    else:
-        return pd.DataFrame()
-
-def calculate_track_mom_growth(track_summary_df):
-    """基于赛道总和数据计算MoM增长率"""
-    if track_summary_df.empty:
-        return pd.DataFrame()
-    
-    month_columns = ['2025年1月访问量', '2025年2月访问量', '2025年3月访问量', 
-                    '2025年4月访问量', '2025年5月访问量', '2025年6月访问量']
-    
-    # 确保所有月份列都是数值类型
-    for col in month_columns:
-        if col in track_summary_df.columns:
-            track_summary_df[col] = pd.to_numeric(track_summary_df[col], errors='coerce').fillna(0)
-    
-    # 计算每月的MoM增长率（5个月环比）
-    mom_data = []
-    
-    for _, row in track_summary_df.iterrows():
-        track_name = row.get('赛道分类', '未知赛道')
-        mom_row = {'赛道分类': track_name}
-        
-        # 计算5个月的环比增长率
-        for i in range(1, len(month_columns)):
-            current_month = month_columns[i]
-            previous_month = month_columns[i-1]
-            
-            current_value = row.get(current_month, 0)
-            previous_value = row.get(previous_month, 0)
-            
-            # 计算MoM增长率
-            if previous_value > 0:
-                growth_rate = ((current_value - previous_value) / previous_value) * 100
-            else:
-                growth_rate = 0 if current_value == 0 else 100
-            
-            # 月份名称（如：2月MoM、3月MoM等）
-            month_num = i + 1
-            mom_col_name = f"{month_num}月MoM"
-            mom_row[mom_col_name] = round(growth_rate, 1)
-        
-        mom_data.append(mom_row)
-    
-    return pd.DataFrame(mom_data)
-
-def create_mom_heatmap(df):
-    """创建MoM增长率热力图"""
-    # 从赛道文件获取总和数据
-    track_summary_df = load_track_summary_data()
-    
-    if track_summary_df.empty:
-        return None
-    
-    # 计算各赛道的总访问量（6个月总和）
-    month_columns = ['2025年1月访问量', '2025年2月访问量', '2025年3月访问量', 
-                    '2025年4月访问量', '2025年5月访问量', '2025年6月访问量']
-    
-    # 确保月份列为数值型
-    for col in month_columns:
-        if col in track_summary_df.columns:
-            track_summary_df[col] = pd.to_numeric(track_summary_df[col], errors='coerce').fillna(0)
-    
-    # 计算总访问量
-    track_summary_df['总访问量'] = track_summary_df[month_columns].sum(axis=1)
-    
-    # 计算MoM增长率
-    mom_df = calculate_track_mom_growth(track_summary_df)
-    
-    if mom_df.empty:
-        return None
-    
-    # 将总访问量信息添加到MoM数据中
-    track_summary_df_indexed = track_summary_df.set_index('赛道分类')
-    mom_df = mom_df.set_index('赛道分类')
-    mom_df['总访问量'] = track_summary_df_indexed['总访问量']
-    
-    # 按总访问量降序排序（访问量高的在上面）
-    # 注意：由于Plotly热力图从下往上显示，所以要用ascending=True让高访问量显示在顶部
-    mom_df = mom_df.sort_values('总访问量', ascending=True)
-    
-    # 准备热力图数据
-    mom_columns = [col for col in mom_df.columns if 'MoM' in col]
-    
-    if not mom_columns:
-        return None
-    
-    # 创建热力图
-    fig = go.Figure(data=go.Heatmap(
-        z=mom_df[mom_columns].values,
-        x=[col.replace('MoM', '') for col in mom_columns],
-        y=mom_df.index,
-        colorscale='RdYlGn',
-        zmid=0,
-        text=[[f"{val:.1f}%" for val in row] for row in mom_df[mom_columns].values],
-        texttemplate="%{text}",
-        textfont={"size": 14, "color": "black", "family": "Arial Black"},
-        hoverongaps=False,
-        hovertemplate='<b>%{y}</b><br>%{x}环比: %{z:.1f}%<br>总访问量: %{customdata}<extra></extra>',
-        customdata=[[format_number(total_visits)] for total_visits in mom_df['总访问量']]
-    ))
-    
-    fig.update_layout(
-        title={
-            'text': '各赛道月度环比增长率热力图 (MoM%) - 按总访问量排序',
-            'x': 0.5,
-            'font': {'size': 20, 'family': 'Arial Black'}
-        },
-        xaxis_title="月份环比",
-        yaxis_title="AI赛道 (按总访问量排序)",
-        height=600,
-        font=dict(size=12),
-        plot_bgcolor='white',
-        paper_bgcolor='white'
-    )
-    
-    return fig
-
-def create_track_overview_table(df):
-    """创建赛道概览表格"""
-    # 按赛道聚合数据
-    track_summary = df.groupby('赛道分类').agg({
-        'Tools名称': 'count',
-        '2025年6月访问量': 'sum',
-        '半年访问增量': 'sum',
-        '2025H1访问量增速': lambda x: pd.to_numeric(x.str.replace('%', '').str.replace('N/A', '0'), errors='coerce').mean()
-    }).round(1)
-    
-    track_summary.columns = ['工具数量', '6月总访问量', '半年总增量', '平均增速']
-    
-    # 按6月访问量排序
-    track_summary = track_summary.sort_values('6月总访问量', ascending=False)
-    
-    # 保存原始数值用于排序和计算
-    track_summary['6月总访问量_原始'] = track_summary['6月总访问量']
-    track_summary['半年总增量_原始'] = track_summary['半年总增量']
-    
-    # 格式化显示
-    track_summary['工具数量'] = track_summary['工具数量'].apply(lambda x: f"{x:,}")
-    track_summary['6月总访问量'] = track_summary['6月总访问量'].apply(lambda x: format_number(x))
-    track_summary['半年总增量'] = track_summary['半年总增量'].apply(lambda x: format_number(x))
-    track_summary['平均增速'] = track_summary['平均增速'].apply(lambda x: format_number(x, is_percentage=True))
-    
-    return track_summary
-
-def create_growth_distribution_chart(df):
-    """创建增长率分布图表"""
-    # 处理增速数据
-    growth_data = df['2025H1访问量增速'].str.replace('%', '').str.replace('N/A', '0')
-    growth_numeric = pd.to_numeric(growth_data, errors='coerce').fillna(0)
-    
-    # 分段显示分布，使用更合理的区间
-    fig = make_subplots(
-        rows=2, cols=2,
-        subplot_titles=('主要分布 (-50% ~ 200%)', '稳定增长 (0% ~ 50%)', '高速增长 (50% ~ 200%)', '下降趋势 (-50% ~ 0%)'),
-        specs=[[{"type": "histogram"}, {"type": "histogram"}],
-               [{"type": "histogram"}, {"type": "histogram"}]]
-    )
-    
-    # 主要分布 (-50% ~ 200%)
-    main_growth = growth_numeric[(growth_numeric >= -50) & (growth_numeric <= 200)]
-    fig.add_trace(
-        go.Histogram(
-            x=main_growth, 
-            nbinsx=25, 
-            name="主要分布", 
-            marker_color='rgba(99, 102, 241, 0.8)',
-            hovertemplate='增长率: %{x:.1f}%<br>工具数: %{y}<extra></extra>'
-        ),
-        row=1, col=1
-    )
-    
-    # 稳定增长 (0% ~ 50%)
-    stable_growth = growth_numeric[(growth_numeric >= 0) & (growth_numeric <= 50)]
-    fig.add_trace(
-        go.Histogram(
-            x=stable_growth, 
-            nbinsx=15, 
-            name="稳定增长",
-            marker_color='rgba(16, 185, 129, 0.8)',
-            hovertemplate='增长率: %{x:.1f}%<br>工具数: %{y}<extra></extra>'
-        ),
-        row=1, col=2
-    )
-    
-    # 高速增长 (50% ~ 200%)
-    high_growth = growth_numeric[(growth_numeric > 50) & (growth_numeric <= 200)]
-    fig.add_trace(
-        go.Histogram(
-            x=high_growth, 
-            nbinsx=15, 
-            name="高速增长",
-            marker_color='rgba(245, 158, 11, 0.8)',
-            hovertemplate='增长率: %{x:.1f}%<br>工具数: %{y}<extra></extra>'
-        ),
-        row=2, col=1
-    )
-    
-    # 下降趋势 (-50% ~ 0%)
-    negative_growth = growth_numeric[(growth_numeric >= -50) & (growth_numeric < 0)]
-    fig.add_trace(
-        go.Histogram(
-            x=negative_growth, 
-            nbinsx=15, 
-            name="下降趋势",
-            marker_color='rgba(239, 68, 68, 0.8)',
-            hovertemplate='增长率: %{x:.1f}%<br>工具数: %{y}<extra></extra>'
-        ),
-        row=2, col=2
-    )
-    
-    # 更新坐标轴标签
-    fig.update_xaxes(title_text="增长率 (%)", row=1, col=1)
-    fig.update_xaxes(title_text="增长率 (%)", row=1, col=2)
-    fig.update_xaxes(title_text="增长率 (%)", row=2, col=1)
-    fig.update_xaxes(title_text="增长率 (%)", row=2, col=2)
-    
-    fig.update_yaxes(title_text="工具数量", row=1, col=1)
-    fig.update_yaxes(title_text="工具数量", row=1, col=2)
-    fig.update_yaxes(title_text="工具数量", row=2, col=1)
-    fig.update_yaxes(title_text="工具数量", row=2, col=2)
-    
-    fig.update_layout(
-        title={
-            'text': '2025H1访问量增速分布分析',
-            'x': 0.5,
-            'font': {'size': 20}
-        },
-        height=600,
-        showlegend=False
-    )
-    
-    return fig
-
-def create_track_detail_page(df, track_name):
-    """创建赛道详情页面"""
-    track_data = df[df['赛道分类'] == track_name].copy()
-    
-    if track_data.empty:
-        st.warning(f"未找到 {track_name} 的数据")
+def render_startup_report():
+    """在侧边栏展示启动报告（仅通过 serve.py 启动时存在）"""
+    report = get_startup_report()
+    if not report:
         return
     
-    # 赛道概览指标
+    with st.sidebar.expander("⏱️ 启动报告", expanded=False):
+        st.caption(f"预热状态: {report['状态']}")
+        st.caption(f"导入耗时 {report['导入耗时(秒)']:.2f}s，预热耗时 {report['预热耗时(秒)']:.2f}s")
+        st.dataframe(pd.DataFrame(report['明细']), use_container_width=True, hide_index=True)
+
+def render_metric_cards(metrics, total_label):
+    """渲染四个核心指标卡片（平均增速卡片附带中位数和P90）"""
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        tool_count = len(track_data)
         st.markdown(f"""
         <div class="metric-card">
-            <div class="metric-value">{tool_count:,}</div>
-            <div class="metric-label">工具总数</div>
+            <div class="metric-value">{metrics['工具总数']:,}</div>
+            <div class="metric-label">{total_label}</div>
         </div>
         """, unsafe_allow_html=True)
     
     with col2:
-        total_visits = track_data['2025年6月访问量'].sum()
         st.markdown(f"""
         <div class="metric-card">
-            <div class="metric-value">{format_number(total_visits)}</div>
+            <div class="metric-value">{format_number(metrics['6月总访问量'])}</div>
             <div class="metric-label">6月总访问量</div>
         </div>
         """, unsafe_allow_html=True)
     
     with col3:
-        total_growth = track_data['半年访问增量'].sum()
         st.markdown(f"""
         <div class="metric-card">
-            <div class="metric-value">{format_number(total_growth)}</div>
+            <div class="metric-value">{format_number(metrics['半年总增量'])}</div>
             <div class="metric-label">半年总增量</div>
         </div>
         """, unsafe_allow_html=True)
     
     with col4:
-        avg_growth = track_data['2025H1访问量增速'].str.replace('%', '').str.replace('N/A', '0')
-        avg_growth_num = pd.to_numeric(avg_growth, errors='coerce').mean()
         st.markdown(f"""
         <div class="metric-card">
-            <div class="metric-value">{format_number(avg_growth_num, is_percentage=True)}</div>
+            <div class="metric-value">{format_number(metrics['平均增速'], is_percentage=True)}</div>
             <div class="metric-label">平均增速</div>
+            <div class="metric-label">中位数 {format_number(metrics['增速中位数'], is_percentage=True)} · P90 {format_number(metrics['增速P90'], is_percentage=True)}</div>
         </div>
         """, unsafe_allow_html=True)
+
+def select_track_tool(track_name, key):
+    """输入名称前缀搜索赛道内的工具，只把最多 MAX_SUGGESTIONS 个候选发送到浏览器；没有候选时返回None"""
+    query = st.text_input("搜索工具（名称前缀，不区分大小写）", key=f"{key}_query")
+    suggestions = search_tools(get_rank_index(), query, track_name)
+    if not suggestions:
+        if query:
+            st.info(f"{track_name} 中没有以 \"{query}\" 开头的工具")
+        return None
     
-    # TOP 10工具排行
-    st.markdown(f"### 🏆 {track_name} TOP 10 工具")
+    return st.selectbox(
+        f"选择工具（按6月访问量排序，最多显示{MAX_SUGGESTIONS}个）",
+        suggestions,
+        key=key
+    )
+
+def render_tool_drilldown(track_name):
+    """工具排名查询：展示所选工具的全局和赛道内排名与百分位"""
+    st.markdown(f"### 🔎 {track_name} 工具排名查询")
+    
+    rank_index = get_rank_index()
+    selected_tool = select_track_tool(track_name, f"tool_drilldown_{track_name}")
+    if selected_tool is None:
+        return
+    
+    ranks = lookup_tool_ranks(rank_index, selected_tool)
+    if ranks:
+        st.dataframe(create_tool_rank_table(ranks), use_container_width=True, hide_index=True)
+
+def render_similar_tools(df, track_name, filters=None):
+    """相似增长曲线：查找与所选工具曲线形状最接近的工具（本赛道或全部赛道），有筛选条件时只在筛选结果中查找"""
+    st.markdown(f"### 🧬 {track_name} 相似增长曲线")
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        selected_tool = select_track_tool(track_name, f"similar_tool_{track_name}")
+    with col2:
+        # 全局样式隐藏了单选按钮，这里用选择框
+        scope = st.selectbox("查找范围", ["本赛道", "全部赛道"], key=f"similar_scope_{track_name}")
+    if selected_tool is None:
+        return
+    
+    candidates = filter_positions(get_filter_index(), filters) if filters is not None else None
+    result = find_similar_tools(get_similarity_index(), selected_tool,
+                                track=track_name if scope == "本赛道" else None, candidates=candidates)
+    if result is None:
+        st.info(f"{selected_tool} 各月访问量相同，无法比较曲线形状")
+        return
+    
+    rows, scores = result
+    if len(rows) == 0:
+        st.info("没有可比较的工具")
+        return
+    
+    st.dataframe(create_similar_tools_table(df, rows, scores), use_container_width=True, hide_index=True)
+    
+    from charts import get_similar_trajectory_chart
+    query_pos = get_similarity_index()['positions'][selected_tool]
+    chart_rows = tuple(int(row) for row in (query_pos, *rows[:5]))
+    st.plotly_chart(get_similar_trajectory_chart(chart_rows, selected_tool), use_container_width=True)
+
+def create_track_detail_page(df, track_name, filters=None):
+    """创建赛道详情页面；分块聚合模式下指标、TOP 10和图表均来自聚合状态，有筛选条件时基于筛选后的数据"""
+    ingest_mode = bool(get_ingest_source())
+    if ingest_mode:
+        from ingest import aggregation_to_track_metrics, aggregation_top_tools, get_ingested_aggregation
+        aggregation = get_ingested_aggregation()
+        metrics = aggregation_to_track_metrics(aggregation, track_name)
+    elif filters is not None:
+        # 赛道位图与筛选位图按位与，不对整表逐行比较赛道
+        track_data = get_filtered_data(make_filters(filters.min_visits, filters.growth_range, (track_name,),
+                                                    filters.tags))
+        metrics = calculate_overall_metrics(track_data)
+    else:
+        metrics = get_track_metrics(track_name)
+    
+    if metrics['工具总数'] == 0:
+        st.warning(f"没有符合筛选条件的 {track_name} 工具" if filters is not None else f"未找到 {track_name} 的数据")
+        return
     
-    # 按6月访问量排序
-    top_tools = track_data.nlargest(10, '2025年6月访问量')[
-        ['Tools名称', '2025年6月访问量', '半年访问增量', '2025H1访问量增速']
-    ].copy()
+    # 赛道概览指标
+    render_metric_cards(metrics, "工具总数")
     
-    # 格式化数据显示
-    top_tools['6月访问量'] = top_tools['2025年6月访问量'].apply(lambda x: format_number(x))
-    top_tools['半年增量'] = top_tools['半年访问增量'].apply(lambda x: format_number(x))
-    top_tools['增长率'] = top_tools['2025H1访问量增速'].apply(lambda x: format_growth_rate(x))
+    # TOP 10工具排行
+    st.markdown(f"### 🏆 {track_name} TOP 10 工具")
     
-    # 重置索引并添加排名
-    display_df = top_tools[['Tools名称', '6月访问量', '半年增量', '增长率']].copy()
-    display_df.reset_index(drop=True, inplace=True)
-    display_df.index = display_df.index + 1
+    if ingest_mode:
+        display_df = create_top_tools_table(aggregation_top_tools(aggregation, track_name), 10)
+    elif filters is not None:
+        display_df = create_top_tools_table(track_data, 10)
+    else:
+        display_df = get_top_tools_table(track_name, 10)
     
     # 设置表格样式，数字居中对齐
     st.markdown("""
@@ -674,188 +463,42 @@ def create_track_detail_page(df, track_name):
     st.dataframe(display_df, use_container_width=True)
     st.markdown('</div>', unsafe_allow_html=True)
     
+    # 工具排名查询和相似曲线（需要完整明细，分块聚合模式下不提供）
+    if not ingest_mode:
+        render_tool_drilldown(track_name)
+        render_similar_tools(df, track_name, filters)
+    
+    # 图表在首次绘图时才导入Plotly
+    if ingest_mode:
+        from charts import get_ingested_track_figures
+        figures = get_ingested_track_figures(track_name)
+    elif filters is not None:
+        from charts import create_track_figures
+        figures = create_track_figures(track_data, track_name)
+    else:
+        from charts import get_track_figures
+        figures = get_track_figures(track_name)
+    
     # 月度趋势图
     st.markdown(f"### 📈 {track_name} 月度访问量趋势")
-    
-    month_columns = ['2025年1月访问量', '2025年2月访问量', '2025年3月访问量', 
-                    '2025年4月访问量', '2025年5月访问量', '2025年6月访问量']
-    
-    # 选择显示前5名工具的趋势
-    top_5_tools = track_data.nlargest(5, '2025年6月访问量')
-    
-    fig = go.Figure()
-    
-    colors = ['#6366f1', '#8b5cf6', '#06b6d4', '#10b981', '#f59e0b']
-    
-    for idx, (_, tool) in enumerate(top_5_tools.iterrows()):
-        visits = [tool[col] for col in month_columns]
-        months = ['1月', '2月', '3月', '4月', '5月', '6月']
-        
-        # 格式化hover text
-        hover_text = [f"{month}: {format_number(visit)}" for month, visit in zip(months, visits)]
-        
-        fig.add_trace(go.Scatter(
-            x=months,
-            y=visits,
-            mode='lines+markers',
-            name=tool['Tools名称'][:20] + ('...' if len(tool['Tools名称']) > 20 else ''),
-            line=dict(width=3, color=colors[idx % len(colors)]),
-            marker=dict(size=8),
-            hovertemplate='<b>%{fullData.name}</b><br>%{text}<extra></extra>',
-            text=hover_text
-        ))
-    
-    fig.update_layout(
-        title=f"{track_name} TOP 5 工具月度访问量趋势",
-        xaxis_title="月份",
-        yaxis_title="访问量",
-        height=500,
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
-        )
-    )
-    
-    # 格式化Y轴
-    fig.update_yaxes(tickformat=",.0f")
-    
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(figures['trend'], use_container_width=True)
     
     # 月度环比增速分析
     st.markdown(f"### 📈 {track_name} 月度环比增速分析")
-    
-    # 计算各月环比增速
-    month_columns = ['2025年1月访问量', '2025年2月访问量', '2025年3月访问量', 
-                    '2025年4月访问量', '2025年5月访问量', '2025年6月访问量']
-    
-    # 计算赛道总体的月度访问量
-    track_monthly_totals = []
-    for col in month_columns:
-        total = track_data[col].sum()
-        track_monthly_totals.append(total)
-    
-    # 计算环比增速
-    mom_rates = []
-    for i in range(1, len(track_monthly_totals)):
-        if track_monthly_totals[i-1] > 0:
-            mom_rate = ((track_monthly_totals[i] - track_monthly_totals[i-1]) / track_monthly_totals[i-1]) * 100
-        else:
-            mom_rate = 0
-        mom_rates.append(mom_rate)
-    
-    # 创建环比增速图
-    fig_mom = go.Figure()
-    
-    months = ['2月', '3月', '4月', '5月', '6月']
-    colors = ['#ef4444' if rate < 0 else '#10b981' if rate < 20 else '#f59e0b' for rate in mom_rates]
-    
-    fig_mom.add_trace(go.Bar(
-        x=months,
-        y=mom_rates,
-        name='月度环比增速',
-        marker_color=colors,
-        text=[f'{rate:.1f}%' for rate in mom_rates],
-        textposition='auto',
-        hovertemplate='<b>%{x}</b><br>环比增速: %{y:.1f}%<extra></extra>'
-    ))
-    
-    fig_mom.update_layout(
-        title=f'{track_name} 月度环比增速走势',
-        xaxis_title='月份',
-        yaxis_title='环比增速 (%)',
-        height=400,
-        showlegend=False
-    )
-    
-    # 添加零线
-    fig_mom.add_hline(y=0, line_dash="dash", line_color="gray", annotation_text="零增长线")
-    
-    st.plotly_chart(fig_mom, use_container_width=True)
+    st.plotly_chart(figures['mom'], use_container_width=True)
     
     # 访问量与增量双轴图
     st.markdown(f"### 💹 {track_name} 访问量vs增量分析")
-    
-    # 按访问量排序的TOP 15工具
-    top_15_tools = track_data.nlargest(15, '2025年6月访问量')
-    
-    fig_dual = go.Figure()
-    
-    # 6月访问量（柱状图）
-    fig_dual.add_trace(go.Bar(
-        x=top_15_tools['Tools名称'],
-        y=top_15_tools['2025年6月访问量'],
-        name='6月访问量',
-        marker_color='rgba(99, 102, 241, 0.7)',
-        yaxis='y',
-        hovertemplate='<b>%{x}</b><br>6月访问量: %{y:,.0f}<extra></extra>'
-    ))
-    
-    # 半年增量（线图）
-    fig_dual.add_trace(go.Scatter(
-        x=top_15_tools['Tools名称'],
-        y=top_15_tools['半年访问增量'],
-        mode='lines+markers',
-        name='半年增量',
-        line=dict(color='rgba(239, 68, 68, 1)', width=3),
-        marker=dict(size=8, color='rgba(239, 68, 68, 1)'),
-        yaxis='y2',
-        hovertemplate='<b>%{x}</b><br>半年增量: %{y:,.0f}<extra></extra>'
-    ))
-    
-    # 设置双Y轴
-    fig_dual.update_layout(
-        title=f'{track_name} TOP 15工具访问量与增量对比',
-        xaxis_title='工具名称',
-        height=500,
-        yaxis=dict(
-            title='6月访问量',
-            side='left',
-            showgrid=True
-        ),
-        yaxis2=dict(
-            title='半年增量',
-            side='right',
-            overlaying='y',
-            showgrid=False
-        ),
-        legend=dict(x=0.01, y=0.99),
-        hovermode='x unified'
-    )
-    
-    # 旋转X轴标签避免重叠
-    fig_dual.update_xaxes(tickangle=45)
-    
-    st.plotly_chart(fig_dual, use_container_width=True)
+    st.plotly_chart(figures['dual'], use_container_width=True)
     
     # 增长率分析
     st.markdown(f"### 📊 {track_name} 增长率分析")
-    
-    growth_data = track_data['2025H1访问量增速'].str.replace('%', '').str.replace('N/A', '0')
-    growth_numeric = pd.to_numeric(growth_data, errors='coerce').fillna(0)
-    
-    fig = px.histogram(
-        x=growth_numeric,
-        nbins=20,
-        title=f"{track_name} 增长率分布",
-        labels={'x': '增长率 (%)', 'y': '工具数量'},
-        color_discrete_sequence=['#6366f1']
-    )
-    
-    fig.update_traces(
-        hovertemplate='增长率: %{x:.1f}%<br>工具数: %{y}<extra></extra>'
-    )
-    
-    fig.update_layout(height=400)
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(figures['growth'], use_container_width=True)
 
-def create_other_tracks_page(df):
+def create_other_tracks_page(df, other_tracks=None, filters=None):
     """创建其他赛道页面"""
-    key_tracks = ["AI Chatbot", "AI虚拟陪伴", "AI编程", "AI音频", "AI视频"]
-    other_tracks = [track for track in df['赛道分类'].unique() 
-                   if track not in key_tracks and track != "其他"]
+    if other_tracks is None:
+        other_tracks = get_other_tracks(df)
     
     st.markdown("## 🔍 其他赛道选择")
     
@@ -868,10 +511,24 @@ def create_other_tracks_page(df):
     
     if selected_track:
         st.markdown(f"## 📊 {selected_track} 详细分析")
-        create_track_detail_page(df, selected_track)
+        create_track_detail_page(df, selected_track, filters)
 
 def main():
     """主函数"""
+    # 先渲染侧边栏导航，首屏不必等待数据加载
+    current_page = create_sidebar_navigation()
+    render_startup_report()
+    
+    # 数据变化页只读取保存的对比结果，不需要加载总表
+    if current_page == "数据变化":
+        render_changes_page()
+        return
+    
+    # 配置了分块数据源时，各页面只用分块聚合结果，不加载明细数据
+    if get_ingest_source():
+        render_ingested_page(current_page)
+        return
+    
     # 加载数据
     df = load_data()
     
@@ -879,89 +536,236 @@ def main():
         st.error("无法加载数据，请检查数据文件")
         return
     
-    # 创建侧边栏导航并获取当前页面
-    current_page = create_sidebar_navigation()
+    filters = create_filter_controls(current_page)
     
     # 主内容区域
     if current_page == "总览":
         # 页面标题
         st.markdown('<h1 class="main-title">📊 AI工具数据总览</h1>', unsafe_allow_html=True)
         
-        # 核心指标
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            total_tools = len(df)
-            st.markdown(f"""
-            <div class="metric-card">
-                <div class="metric-value">{total_tools:,}</div>
-                <div class="metric-label">AI工具总数</div>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col2:
-            total_visits = df['2025年6月访问量'].sum()
-            st.markdown(f"""
-            <div class="metric-card">
-                <div class="metric-value">{format_number(total_visits)}</div>
-                <div class="metric-label">6月总访问量</div>
-            </div>
-            """, unsafe_allow_html=True)
+        if filters is not None:
+            render_filtered_overview(filters)
+            return
         
-        with col3:
-            total_growth = df['半年访问增量'].sum()
-            st.markdown(f"""
-            <div class="metric-card">
-                <div class="metric-value">{format_number(total_growth)}</div>
-                <div class="metric-label">半年总增量</div>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col4:
-            avg_growth = df['2025H1访问量增速'].str.replace('%', '').str.replace('N/A', '0')
-            avg_growth_num = pd.to_numeric(avg_growth, errors='coerce').mean()
-            st.markdown(f"""
-            <div class="metric-card">
-                <div class="metric-value">{format_number(avg_growth_num, is_percentage=True)}</div>
-                <div class="metric-label">平均增速</div>
-            </div>
-            """, unsafe_allow_html=True)
+        # 核心指标
+        render_metric_cards(get_overall_metrics(), "AI工具总数")
         
         # 赛道概览表
         st.markdown("## 🎯 赛道概览")
-        track_overview = create_track_overview_table(df)
+        track_overview = get_track_overview()
         
         # 显示表格（不包含原始数据列）
-        display_cols = ['工具数量', '6月总访问量', '半年总增量', '平均增速']
+        display_cols = ['工具数量', '6月总访问量', '半年总增量', '平均增速', '增速中位数']
         st.dataframe(track_overview[display_cols], use_container_width=True)
         
+        # 图表在首次绘图时才导入Plotly
+        from charts import get_growth_distribution_chart, get_mom_heatmap
+        
         # MoM热力图
         st.markdown("## 🌡️ 月度环比增长率分析")
-        mom_heatmap = create_mom_heatmap(df)
+        mom_heatmap = get_mom_heatmap()
         if mom_heatmap:
             st.plotly_chart(mom_heatmap, use_container_width=True)
         
         # 增长率分布
         st.markdown("## 📊 增长率分布分析")
-        growth_chart = create_growth_distribution_chart(df)
+        growth_chart = get_growth_distribution_chart()
         st.plotly_chart(growth_chart, use_container_width=True)
         
-    elif current_page in ["AI Chatbot", "AI虚拟陪伴", "AI编程", "AI音频", "AI视频"]:
+    elif current_page in KEY_TRACKS:
         # 重点赛道详情页
-        icon_map = {
-            "AI Chatbot": "💬",
-            "AI虚拟陪伴": "🤗", 
-            "AI编程": "💻",
-            "AI音频": "🎵",
-            "AI视频": "🎬"
-        }
-        st.markdown(f'<h1 class="main-title">{icon_map[current_page]} {current_page} 详细分析</h1>', unsafe_allow_html=True)
-        create_track_detail_page(df, current_page)
+        st.markdown(f'<h1 class="main-title">{TRACK_ICONS[current_page]} {current_page} 详细分析</h1>', unsafe_allow_html=True)
+        create_track_detail_page(df, current_page, filters)
         
     elif current_page == "其他赛道":
         # 其他赛道页面
         st.markdown('<h1 class="main-title">🔍 其他赛道</h1>', unsafe_allow_html=True)
-        create_other_tracks_page(df)
+        create_other_tracks_page(df, filters=filters)
+
+def create_filter_controls(current_page):
+    """侧边栏筛选条件，返回 FilterSet；未设置任何条件时返回None"""
+    index = get_filter_index()
+    
+    with st.sidebar.expander("🔎 筛选", expanded=False):
+        min_visits = st.select_slider(
+            "最低6月访问量",
+            options=VISIT_THRESHOLDS,
+            value=0,
+            format_func=format_number,
+            key="filter_min_visits"
+        )
+        growth_range = st.slider(
+            "增速区间 (%)",
+            min_value=GROWTH_SLIDER_RANGE[0],
+            max_value=GROWTH_SLIDER_RANGE[1],
+            value=GROWTH_SLIDER_RANGE,
+            step=5,
+            key="filter_growth"
+        )
+        # 赛道筛选只在总览页有意义，详情页本身已限定赛道
+        tracks = []
+        if current_page == "总览":
+            tracks = st.multiselect("赛道", list(index['track_bitmaps']), key="filter_tracks")
+        tags = st.multiselect("标签（命中任一）", index['tag_options'], key="filter_tags")
+    
+    # 滑块拖到两端时该侧不设限
+    low, high = growth_range
+    if (low, high) == GROWTH_SLIDER_RANGE:
+        growth_range = None
+    else:
+        growth_range = (low if low > GROWTH_SLIDER_RANGE[0] else -float('inf'),
+                        high if high < GROWTH_SLIDER_RANGE[1] else float('inf'))
+    
+    return make_filters(min_visits, growth_range, tracks, tags)
+
+def render_filtered_overview(filters):
+    """总览页（有筛选条件）：指标、赛道概览和图表基于筛选后的数据即时计算"""
+    filtered = get_filtered_data(filters)
+    st.caption(f"筛选后 {len(filtered):,} 个工具")
+    if filtered.empty:
+        st.warning("没有符合筛选条件的工具")
+        return
+    
+    render_metric_cards(calculate_overall_metrics(filtered), "AI工具总数")
+    
+    st.markdown("## 🎯 赛道概览")
+    display_cols = ['工具数量', '6月总访问量', '半年总增量', '平均增速', '增速中位数']
+    st.dataframe(create_track_overview_table(filtered)[display_cols], use_container_width=True)
+    
+    from charts import create_overview_figures
+    mom_heatmap, growth_chart = create_overview_figures(filtered)
+    
+    st.markdown("## 🌡️ 月度环比增长率分析")
+    if mom_heatmap:
+        st.plotly_chart(mom_heatmap, use_container_width=True)
+    
+    st.markdown("## 📊 增长率分布分析")
+    st.plotly_chart(growth_chart, use_container_width=True)
+
+def render_ingested_overview():
+    """总览页（分块聚合模式）：指标、赛道概览和图表均来自 TOOLIFY_INGEST_SOURCE 的增量聚合结果"""
+    from charts import get_ingested_overview_figures
+    from ingest import aggregation_to_overall_metrics, aggregation_to_track_table, get_ingested_aggregation
+    
+    try:
+        aggregation = get_ingested_aggregation()
+    except Exception as e:
+        st.error(f"分块聚合失败: {e}")
+        return
+    
+    st.markdown('<h1 class="main-title">📊 AI工具数据总览</h1>', unsafe_allow_html=True)
+    st.caption(f"分块聚合模式：{get_ingest_source()}（{aggregation['rows']:,} 行）")
+    
+    render_metric_cards(aggregation_to_overall_metrics(aggregation), "AI工具总数")
+    
+    st.markdown("## 🎯 赛道概览")
+    track_overview = format_track_overview(aggregation_to_track_table(aggregation))
+    display_cols = ['工具数量', '6月总访问量', '半年总增量', '平均增速', '增速中位数']
+    st.dataframe(track_overview[display_cols], use_container_width=True)
+    
+    mom_heatmap, growth_chart = get_ingested_overview_figures()
+    st.markdown("## 🌡️ 月度环比增长率分析")
+    st.plotly_chart(mom_heatmap, use_container_width=True)
+    st.markdown("## 📊 增长率分布分析")
+    st.plotly_chart(growth_chart, use_container_width=True)
+
+def render_changes_page():
+    """数据变化页：展示 snapshot_diff.py 保存的两期总表对比结果"""
+    from snapshot_diff import DIFF_FILE, load_diff
+    
+    st.markdown('<h1 class="main-title">🔄 数据变化</h1>', unsafe_allow_html=True)
+    
+    diff = load_diff()
+    if diff is None:
+        st.info(f"尚无对比结果，请先运行 `python snapshot_diff.py 上期总表.xlsx` 生成 {DIFF_FILE}")
+        return
+    
+    st.caption(f"{diff['上期文件']} → {diff['本期文件']}（{diff['生成时间']}）")
+    st.dataframe(pd.DataFrame([diff['summary']]), use_container_width=True, hide_index=True)
+    if diff['affected_tracks']:
+        st.markdown(f"**受影响赛道**：{'、'.join(diff['affected_tracks'])}")
+    if diff['removed_tracks']:
+        st.markdown(f"**下架赛道**：{'、'.join(diff['removed_tracks'])}")
+    
+    sections = [
+        ('swings', '📈 访问量大幅波动'),
+        ('reassigned', '🔀 赛道调整'),
+        ('added', '🆕 新增工具'),
+        ('removed', '🗑️ 下架工具'),
+        ('changed', '✏️ 内容变化'),
+    ]
+    for key, title in sections:
+        table = diff[key]
+        st.markdown(f"### {title}（{len(table):,}）")
+        if not table.empty:
+            st.dataframe(table, use_container_width=True, hide_index=True)
+
+def render_ingested_page(current_page):
+    """分块聚合模式下的页面分发"""
+    if current_page == "总览":
+        render_ingested_overview()
+    elif current_page in KEY_TRACKS:
+        st.markdown(f'<h1 class="main-title">{TRACK_ICONS[current_page]} {current_page} 详细分析</h1>', unsafe_allow_html=True)
+        create_track_detail_page(None, current_page)
+    elif current_page == "其他赛道":
+        from ingest import get_ingested_aggregation
+        tracks = get_ingested_aggregation()['tracks']
+        other_tracks = [track for track in tracks if track not in KEY_TRACKS and track != "其他"]
+        st.markdown('<h1 class="main-title">🔍 其他赛道</h1>', unsafe_allow_html=True)
+        create_other_tracks_page(None, other_tracks)
+
+def render_memory_diagnostics(session_id):
+    """在侧边栏展示内存诊断结果（需设置 TOOLIFY_MEMORY_DIAGNOSTICS=1）"""
+    with st.sidebar.expander("🧠 内存诊断", expanded=False):
+        st.caption("tracemalloc统计整个进程：与其他会话或后台预热/预取重叠的rerun标记为\"并发\"，"
+                   "其增长可能来自其他活动，不计入页面累计和泄漏判断")
+        history = memory_diagnostics.get_session_history(session_id)
+        if history:
+            st.caption(f"当前会话最近 {min(len(history), 10)} 次rerun")
+            st.dataframe(pd.DataFrame(history[-10:]), use_container_width=True, hide_index=True)
+        
+        st.caption("各页面累计净增长")
+        st.dataframe(pd.DataFrame(memory_diagnostics.get_page_stats()), use_container_width=True, hide_index=True)
+        
+        growing_sessions = memory_diagnostics.find_growing_sessions()
+        if growing_sessions:
+            st.warning(f"{len(growing_sessions)} 个会话内存持续增长，疑似泄漏")
+            st.dataframe(pd.DataFrame(growing_sessions), use_container_width=True, hide_index=True)
+        
+        # 完整快照开销较大，按需采集
+        if st.button("📸 采集内存快照", key="memdiag_snapshot"):
+            with st.spinner("采集快照中..."):
+                memory_diagnostics.capture_snapshot()
+        
+        top_allocations = memory_diagnostics.get_top_allocations()
+        if top_allocations:
+            st.caption("与上一次快照相比增长最多的分配位置")
+            st.dataframe(pd.DataFrame(top_allocations), use_container_width=True, hide_index=True)
+        else:
+            st.caption("采集两次快照后显示主要分配位置")
+
+def run_with_memory_diagnostics():
+    """运行主函数，并记录本次rerun的内存变化"""
+    ctx = get_script_run_ctx()
+    session_id = ctx.session_id if ctx else "unknown"
+    
+    start_record = memory_diagnostics.begin_rerun()
+    try:
+        main()
+    finally:
+        page = st.session_state.get('current_page', '总览')
+        if page == '其他赛道' and st.session_state.get('other_track_select'):
+            page = f"{page}/{st.session_state.other_track_select}"
+        memory_diagnostics.end_rerun(session_id, page, start_record)
+    
+    render_memory_diagnostics(session_id)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if memory_diagnostics.is_enabled():
+        run_with_memory_diagnostics()
+    else:
+        main()
+    
+    # 当前页渲染完成后，在后台预取接下来最可能访问的页面
+    schedule_prefetch(st.session_state.current_page, list(NAV_PAGES))
+
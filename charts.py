@@ -0,0 +1,517 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+仪表板图表构建
+
+create_* 函数根据传入数据构建Plotly图表；get_* 函数按数据版本缓存图表对象，
+供仪表板页面和启动预热共用，缓存前经 figure_payload.compact_figure() 压缩传输体积。本模块导入Plotly，首屏渲染时按需导入。
+"""
+
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from aggregates import (calculate_growth_quantiles, calculate_mom_matrix, calculate_monthly_mom_rates, get_mom_matrix,
+                        get_track_data, summarize_track_months)
+from data_loader import MONTH_COLUMNS, load_summary_data, memoize_by_data_version
+from figure_payload import compact_figure
+from formatting import format_number, parse_growth_rates
+
+
+def create_mom_heatmap(mom_df):
+    """创建MoM增长率热力图"""
+    if mom_df.empty:
+        return None
+
+    # 准备热力图数据
+    mom_columns = [col for col in mom_df.columns if 'MoM' in col]
+
+    if not mom_columns:
+        return None
+
+    # 创建热力图
+    fig = go.Figure(data=go.Heatmap(
+        z=mom_df[mom_columns].values,
+        x=[col.replace('MoM', '') for col in mom_columns],
+        y=mom_df.index,
+        colorscale='RdYlGn',
+        zmid=0,
+        # 单元格文字由前端按模板生成，不再逐格发送字符串
+        texttemplate="%{z:.1f}%",
+        textfont={"size": 14, "color": "black", "family": "Arial Black"},
+        hoverongaps=False,
+        hovertemplate='<b>%{y}</b><br>%{x}环比: %{z:.1f}%<br>总访问量: %{customdata}<extra></extra>',
+        customdata=[[format_number(total_visits)] for total_visits in mom_df['总访问量']]
+    ))
+
+    fig.update_layout(
+        title={
+            'text': '各赛道月度环比增长率热力图 (MoM%) - 按总访问量排序',
+            'x': 0.5,
+            'font': {'size': 20, 'family': 'Arial Black'}
+        },
+        xaxis_title="月份环比",
+        yaxis_title="AI赛道 (按总访问量排序)",
+        height=600,
+        font=dict(size=12),
+        plot_bgcolor='white',
+        paper_bgcolor='white'
+    )
+
+    return fig
+
+def add_growth_quantile_lines(fig, quantiles, row=None, col=None):
+    """在增速分布图上标出中位数和P90"""
+    for name, value in quantiles.items():
+        if np.isnan(value):
+            continue
+        label = name.replace('增速', '')
+        fig.add_vline(x=value, line_dash="dash", line_color="gray",
+                      annotation_text=f"{label} {value:.1f}%", row=row, col=col)
+    return fig
+
+def create_growth_distribution_chart(df):
+    """创建增长率分布图表"""
+    # 处理增速数据
+    growth_rates = parse_growth_rates(df['2025H1访问量增速'])
+    growth_numeric = growth_rates.fillna(0)
+
+    # 分段显示分布，使用更合理的区间
+    fig = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=('主要分布 (-50% ~ 200%)', '稳定增长 (0% ~ 50%)', '高速增长 (50% ~ 200%)', '下降趋势 (-50% ~ 0%)'),
+        specs=[[{"type": "histogram"}, {"type": "histogram"}],
+               [{"type": "histogram"}, {"type": "histogram"}]]
+    )
+
+    # 主要分布 (-50% ~ 200%)
+    main_growth = growth_numeric[(growth_numeric >= -50) & (growth_numeric <= 200)]
+    fig.add_trace(
+        go.Histogram(
+            x=main_growth,
+            nbinsx=25,
+            name="主要分布",
+            marker_color='rgba(99, 102, 241, 0.8)',
+            hovertemplate='增长率: %{x:.1f}%<br>工具数: %{y}<extra></extra>'
+        ),
+        row=1, col=1
+    )
+
+    # 稳定增长 (0% ~ 50%)
+    stable_growth = growth_numeric[(growth_numeric >= 0) & (growth_numeric <= 50)]
+    fig.add_trace(
+        go.Histogram(
+            x=stable_growth,
+            nbinsx=15,
+            name="稳定增长",
+            marker_color='rgba(16, 185, 129, 0.8)',
+            hovertemplate='增长率: %{x:.1f}%<br>工具数: %{y}<extra></extra>'
+        ),
+        row=1, col=2
+    )
+
+    # 高速增长 (50% ~ 200%)
+    high_growth = growth_numeric[(growth_numeric > 50) & (growth_numeric <= 200)]
+    fig.add_trace(
+        go.Histogram(
+            x=high_growth,
+            nbinsx=15,
+            name="高速增长",
+            marker_color='rgba(245, 158, 11, 0.8)',
+            hovertemplate='增长率: %{x:.1f}%<br>工具数: %{y}<extra></extra>'
+        ),
+        row=2, col=1
+    )
+
+    # 下降趋势 (-50% ~ 0%)
+    negative_growth = growth_numeric[(growth_numeric >= -50) & (growth_numeric < 0)]
+    fig.add_trace(
+        go.Histogram(
+            x=negative_growth,
+            nbinsx=15,
+            name="下降趋势",
+            marker_color='rgba(239, 68, 68, 0.8)',
+            hovertemplate='增长率: %{x:.1f}%<br>工具数: %{y}<extra></extra>'
+        ),
+        row=2, col=2
+    )
+
+    # 更新坐标轴标签
+    fig.update_xaxes(title_text="增长率 (%)", row=1, col=1)
+    fig.update_xaxes(title_text="增长率 (%)", row=1, col=2)
+    fig.update_xaxes(title_text="增长率 (%)", row=2, col=1)
+    fig.update_xaxes(title_text="增长率 (%)", row=2, col=2)
+
+    fig.update_yaxes(title_text="工具数量", row=1, col=1)
+    fig.update_yaxes(title_text="工具数量", row=1, col=2)
+    fig.update_yaxes(title_text="工具数量", row=2, col=1)
+    fig.update_yaxes(title_text="工具数量", row=2, col=2)
+
+    add_growth_quantile_lines(fig, calculate_growth_quantiles(growth_rates), row=1, col=1)
+
+    fig.update_layout(
+        title={
+            'text': '2025H1访问量增速分布分析',
+            'x': 0.5,
+            'font': {'size': 20}
+        },
+        height=600,
+        showlegend=False
+    )
+
+    return fig
+
+def _rebin_growth_histogram(bin_edges, counts, low, high, width):
+    """将1%分箱的增速直方图合并为 [low, high] 区间内宽度为 width 的分箱，返回(箱中心, 计数)"""
+    # counts[k] 对应 [bin_edges[k-1], bin_edges[k])，首尾为下溢/上溢箱
+    left_edges = bin_edges[:-1]
+    inner_counts = counts[1:-1]
+    in_range = (left_edges >= low) & (left_edges <= high)
+    groups = ((left_edges[in_range] - low) // width).astype(int)
+    merged = np.bincount(groups, weights=inner_counts[in_range], minlength=int((high - low) // width) + 1)
+    centers = low + (np.arange(len(merged)) + 0.5) * width
+    return centers, merged
+
+def create_binned_growth_distribution_chart(bin_edges, counts, quantiles=None):
+    """根据预先分箱的增速直方图创建增长率分布图表（分块聚合模式，无需逐行数据），quantiles为分位数草图的估计"""
+    fig = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=('主要分布 (-50% ~ 200%)', '稳定增长 (0% ~ 50%)', '高速增长 (50% ~ 200%)', '下降趋势 (-50% ~ 0%)'),
+        specs=[[{"type": "bar"}, {"type": "bar"}],
+               [{"type": "bar"}, {"type": "bar"}]]
+    )
+
+    # (区间下限, 区间上限, 箱宽, 名称, 颜色, 位置)，箱数与逐行模式的nbinsx接近
+    panels = [
+        (-50, 200, 10, "主要分布", 'rgba(99, 102, 241, 0.8)', 1, 1),
+        (0, 50, 3, "稳定增长", 'rgba(16, 185, 129, 0.8)', 1, 2),
+        (50, 200, 10, "高速增长", 'rgba(245, 158, 11, 0.8)', 2, 1),
+        (-50, -1, 3, "下降趋势", 'rgba(239, 68, 68, 0.8)', 2, 2),
+    ]
+    for low, high, width, name, color, row, col in panels:
+        centers, merged = _rebin_growth_histogram(bin_edges, counts, low, high, width)
+        fig.add_trace(
+            go.Bar(
+                x=centers,
+                y=merged,
+                width=width,
+                name=name,
+                marker_color=color,
+                hovertemplate='增长率: %{x:.1f}%<br>工具数: %{y}<extra></extra>'
+            ),
+            row=row, col=col
+        )
+        fig.update_xaxes(title_text="增长率 (%)", row=row, col=col)
+        fig.update_yaxes(title_text="工具数量", row=row, col=col)
+
+    if quantiles:
+        add_growth_quantile_lines(fig, quantiles, row=1, col=1)
+
+    fig.update_layout(
+        title={
+            'text': '2025H1访问量增速分布分析',
+            'x': 0.5,
+            'font': {'size': 20}
+        },
+        height=600,
+        showlegend=False,
+        bargap=0.05
+    )
+
+    return fig
+
+def create_track_trend_chart(track_data, track_name):
+    """创建赛道TOP 5工具月度访问量趋势图"""
+    # 选择显示前5名工具的趋势
+    top_5_tools = track_data.nlargest(5, '2025年6月访问量')
+
+    fig = go.Figure()
+
+    colors = ['#6366f1', '#8b5cf6', '#06b6d4', '#10b981', '#f59e0b']
+
+    for idx, (_, tool) in enumerate(top_5_tools.iterrows()):
+        visits = [tool[col] for col in MONTH_COLUMNS]
+        months = ['1月', '2月', '3月', '4月', '5月', '6月']
+
+        # 格式化hover text
+        hover_text = [f"{month}: {format_number(visit)}" for month, visit in zip(months, visits)]
+
+        fig.add_trace(go.Scatter(
+            x=months,
+            y=visits,
+            mode='lines+markers',
+            name=tool['Tools名称'][:20] + ('...' if len(tool['Tools名称']) > 20 else ''),
+            line=dict(width=3, color=colors[idx % len(colors)]),
+            marker=dict(size=8),
+            hovertemplate='<b>%{fullData.name}</b><br>%{text}<extra></extra>',
+            text=hover_text
+        ))
+
+    fig.update_layout(
+        title=f"{track_name} TOP 5 工具月度访问量趋势",
+        xaxis_title="月份",
+        yaxis_title="访问量",
+        height=500,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        )
+    )
+
+    # 格式化Y轴
+    fig.update_yaxes(tickformat=",.0f")
+
+    return fig
+
+def create_similar_trajectory_chart(tools, tool_name):
+    """创建相似工具的曲线对比图：各月访问量相对各自6个月均值的百分比，体量不同的工具可直接比较形状"""
+    fig = go.Figure()
+
+    colors = ['#6366f1', '#8b5cf6', '#06b6d4', '#10b981', '#f59e0b', '#ef4444']
+    months = ['1月', '2月', '3月', '4月', '5月', '6月']
+
+    for idx, (_, tool) in enumerate(tools.iterrows()):
+        visits = np.array([tool[col] for col in MONTH_COLUMNS], dtype=np.float64)
+        mean = visits.mean()
+        relative = visits / mean * 100 if mean > 0 else np.zeros_like(visits)
+        is_query = tool['Tools名称'] == tool_name
+
+        fig.add_trace(go.Scatter(
+            x=months,
+            y=relative,
+            mode='lines+markers',
+            name=tool['Tools名称'][:20] + ('...' if len(tool['Tools名称']) > 20 else ''),
+            line=dict(width=5 if is_query else 2, color=colors[idx % len(colors)], dash=None if is_query else 'dot'),
+            marker=dict(size=8),
+            hovertemplate='<b>%{fullData.name}</b><br>%{x}: %{y:.1f}%<br>访问量: %{text}<extra></extra>',
+            text=[format_number(visit) for visit in visits]
+        ))
+
+    fig.update_layout(
+        title=f"与 {tool_name} 增长曲线最相似的工具",
+        xaxis_title="月份",
+        yaxis_title="相对6个月均值(%)",
+        height=450,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        )
+    )
+
+    return fig
+
+def create_track_mom_chart(track_data, track_name):
+    """创建赛道月度环比增速柱状图"""
+    mom_rates = calculate_monthly_mom_rates(track_data)
+
+    fig_mom = go.Figure()
+
+    months = ['2月', '3月', '4月', '5月', '6月']
+    colors = ['#ef4444' if rate < 0 else '#10b981' if rate < 20 else '#f59e0b' for rate in mom_rates]
+
+    fig_mom.add_trace(go.Bar(
+        x=months,
+        y=mom_rates,
+        name='月度环比增速',
+        marker_color=colors,
+        texttemplate='%{y:.1f}%',
+        textposition='auto',
+        hovertemplate='<b>%{x}</b><br>环比增速: %{y:.1f}%<extra></extra>'
+    ))
+
+    fig_mom.update_layout(
+        title=f'{track_name} 月度环比增速走势',
+        xaxis_title='月份',
+        yaxis_title='环比增速 (%)',
+        height=400,
+        showlegend=False
+    )
+
+    # 添加零线
+    fig_mom.add_hline(y=0, line_dash="dash", line_color="gray", annotation_text="零增长线")
+
+    return fig_mom
+
+def create_track_dual_axis_chart(track_data, track_name):
+    """创建赛道TOP 15工具访问量与增量双轴图"""
+    # 按访问量排序的TOP 15工具
+    top_15_tools = track_data.nlargest(15, '2025年6月访问量')
+
+    fig_dual = go.Figure()
+
+    # 6月访问量（柱状图）
+    fig_dual.add_trace(go.Bar(
+        x=top_15_tools['Tools名称'],
+        y=top_15_tools['2025年6月访问量'],
+        name='6月访问量',
+        marker_color='rgba(99, 102, 241, 0.7)',
+        yaxis='y',
+        hovertemplate='<b>%{x}</b><br>6月访问量: %{y:,.0f}<extra></extra>'
+    ))
+
+    # 半年增量（线图）
+    fig_dual.add_trace(go.Scatter(
+        x=top_15_tools['Tools名称'],
+        y=top_15_tools['半年访问增量'],
+        mode='lines+markers',
+        name='半年增量',
+        line=dict(color='rgba(239, 68, 68, 1)', width=3),
+        marker=dict(size=8, color='rgba(239, 68, 68, 1)'),
+        yaxis='y2',
+        hovertemplate='<b>%{x}</b><br>半年增量: %{y:,.0f}<extra></extra>'
+    ))
+
+    # 设置双Y轴
+    fig_dual.update_layout(
+        title=f'{track_name} TOP 15工具访问量与增量对比',
+        xaxis_title='工具名称',
+        height=500,
+        yaxis=dict(
+            title='6月访问量',
+            side='left',
+            showgrid=True
+        ),
+        yaxis2=dict(
+            title='半年增量',
+            side='right',
+            overlaying='y',
+            showgrid=False
+        ),
+        legend=dict(x=0.01, y=0.99),
+        hovermode='x unified'
+    )
+
+    # 旋转X轴标签避免重叠
+    fig_dual.update_xaxes(tickangle=45)
+
+    return fig_dual
+
+def create_track_growth_histogram(track_data, track_name):
+    """创建赛道增长率分布直方图"""
+    growth_rates = parse_growth_rates(track_data['2025H1访问量增速'])
+    growth_numeric = growth_rates.fillna(0)
+
+    fig = px.histogram(
+        x=growth_numeric,
+        nbins=20,
+        title=f"{track_name} 增长率分布",
+        labels={'x': '增长率 (%)', 'y': '工具数量'},
+        color_discrete_sequence=['#6366f1']
+    )
+
+    fig.update_traces(
+        hovertemplate='增长率: %{x:.1f}%<br>工具数: %{y}<extra></extra>'
+    )
+
+    fig.update_layout(height=400)
+
+    add_growth_quantile_lines(fig, calculate_growth_quantiles(growth_rates))
+
+    return fig
+
+def create_binned_track_growth_histogram(bin_edges, counts, track_name, quantiles=None):
+    """根据预先分箱的增速直方图创建赛道增长率分布图（分块聚合模式），约20个箱"""
+    occupied = np.flatnonzero(counts[1:-1])
+    if occupied.size == 0:
+        low, high = 0.0, 0.0
+    else:
+        low, high = bin_edges[occupied[0]], bin_edges[occupied[-1]]
+    width = max(1.0, np.ceil((high - low + 1) / 20))
+    centers, merged = _rebin_growth_histogram(bin_edges, counts, low, high, width)
+
+    fig = go.Figure(go.Bar(
+        x=centers,
+        y=merged,
+        width=width,
+        marker_color='#6366f1',
+        hovertemplate='增长率: %{x:.1f}%<br>工具数: %{y}<extra></extra>'
+    ))
+
+    fig.update_layout(
+        title=f"{track_name} 增长率分布",
+        xaxis_title='增长率 (%)',
+        yaxis_title='工具数量',
+        height=400,
+        bargap=0.05
+    )
+
+    if quantiles:
+        add_growth_quantile_lines(fig, quantiles)
+
+    return fig
+
+def create_track_figures(track_data, track_name):
+    """赛道详情页的全部图表（已压缩传输体积）"""
+    figures = {
+        'trend': create_track_trend_chart(track_data, track_name),
+        'mom': create_track_mom_chart(track_data, track_name),
+        'dual': create_track_dual_axis_chart(track_data, track_name),
+        'growth': create_track_growth_histogram(track_data, track_name),
+    }
+    return {key: compact_figure(fig) for key, fig in figures.items()}
+
+def create_overview_figures(df):
+    """总览页的MoM热力图和增速分布图（基于传入数据即时计算，已压缩传输体积）"""
+    mom_heatmap = create_mom_heatmap(calculate_mom_matrix(summarize_track_months(df)))
+    growth_chart = create_growth_distribution_chart(df)
+    return (compact_figure(mom_heatmap) if mom_heatmap else mom_heatmap), compact_figure(growth_chart)
+
+
+@memoize_by_data_version(persist=True)
+def get_mom_heatmap():
+    """MoM热力图（按数据版本缓存）"""
+    fig = create_mom_heatmap(get_mom_matrix())
+    return compact_figure(fig) if fig else fig
+
+@memoize_by_data_version(persist=True)
+def get_growth_distribution_chart():
+    """总览页增长率分布图（按数据版本缓存）"""
+    return compact_figure(create_growth_distribution_chart(load_summary_data()))
+
+@memoize_by_data_version(persist=True)
+def get_track_figures(track_name):
+    """赛道详情页的全部图表（按数据版本缓存）"""
+    return create_track_figures(get_track_data(load_summary_data(), track_name), track_name)
+
+@memoize_by_data_version
+def get_similar_trajectory_chart(rows, tool_name):
+    """相似增长曲线对比图（按数据版本缓存）；rows为总表行号元组，第一个为查询工具"""
+    return compact_figure(create_similar_trajectory_chart(load_summary_data().iloc[list(rows)], tool_name))
+
+@memoize_by_data_version
+def get_ingested_overview_figures():
+    """分块聚合模式下总览页的MoM热力图和增速分布图（按数据版本缓存）"""
+    from ingest import (aggregation_growth_histogram, aggregation_growth_quantiles, aggregation_to_track_summaries,
+                        get_ingested_aggregation)
+
+    aggregation = get_ingested_aggregation()
+    mom_df = calculate_mom_matrix(aggregation_to_track_summaries(aggregation))
+    bin_edges, counts = aggregation_growth_histogram(aggregation)
+    quantiles = aggregation_growth_quantiles(aggregation)
+    return (compact_figure(create_mom_heatmap(mom_df)),
+            compact_figure(create_binned_growth_distribution_chart(bin_edges, counts, quantiles)))
+
+@memoize_by_data_version
+def get_ingested_track_figures(track_name):
+    """分块聚合模式下赛道详情页的全部图表：趋势和双轴图来自TOP K，环比和分布来自赛道合计（按数据版本缓存）"""
+    from ingest import (aggregation_growth_histogram, aggregation_growth_quantiles, aggregation_top_tools,
+                        aggregation_track_monthly, get_ingested_aggregation)
+
+    aggregation = get_ingested_aggregation()
+    top_tools = aggregation_top_tools(aggregation, track_name)
+    bin_edges, counts = aggregation_growth_histogram(aggregation, track_name)
+    figures = {
+        'trend': create_track_trend_chart(top_tools, track_name),
+        'mom': create_track_mom_chart(aggregation_track_monthly(aggregation, track_name), track_name),
+        'dual': create_track_dual_axis_chart(top_tools, track_name),
+        'growth': create_binned_track_growth_histogram(bin_edges, counts, track_name,
+                                                       aggregation_growth_quantiles(aggregation, track_name)),
+    }
+    return {key: compact_figure(fig) for key, fig in figures.items()}
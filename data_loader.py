@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据文件加载工具
+
+各赛道Excel文件相互独立，这里用线程池/进程池并发读取，
+冷启动耗时取决于最大的单个文件，而不是所有文件耗时之和。
+
+加载结果按数据版本（数据文件的大小和修改时间）缓存在进程内，
+Streamlit会话和启动预热线程共享同一份缓存。
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from functools import partial, wraps
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+import disk_cache
+from growth_metrics import apply_growth_metrics
+
+# 总表文件和分赛道数据目录
+SUMMARY_FILE = "toolify_processed_2025_summary.xlsx"
+TRACK_DATA_DIR = "data/2025H1"
+
+MONTH_COLUMNS = ['2025年1月访问量', '2025年2月访问量', '2025年3月访问量',
+                 '2025年4月访问量', '2025年5月访问量', '2025年6月访问量']
+
+# 分块读取的数据源（CSV/Parquet文件或副本目录），设置后总览页改用分块聚合结果
+INGEST_SOURCE_ENV = "TOOLIFY_INGEST_SOURCE"
+
+# generate_track_csv.py 输出副本时保存赛道总和行的位置：同名 .summary.json，或Parquet副本的文件元数据
+SUMMARY_SIDECAR_SUFFIXES = ('.summary.json', '.parquet')
+PARQUET_SUMMARY_KEY = b"toolify_summary"
+
+# 并发配置，可通过环境变量覆盖
+LOADER_WORKERS_ENV = "TRACK_LOADER_WORKERS"
+LOADER_EXECUTOR_ENV = "TRACK_LOADER_EXECUTOR"
+
+
+def list_track_files(track_data_dir=TRACK_DATA_DIR):
+    """列出目录下所有赛道Excel文件名（按文件名排序）"""
+    if not os.path.exists(track_data_dir):
+        return []
+
+    return sorted(
+        filename for filename in os.listdir(track_data_dir)
+        if filename.startswith("2025H1") and filename.endswith(".xlsx") and "processed" not in filename
+    )
+
+
+def list_summary_sidecars(track_data_dir=TRACK_DATA_DIR):
+    """列出 generate_track_csv.py 输出副本时写出的赛道总和元数据文件（.summary.json 和Parquet副本）"""
+    if not os.path.exists(track_data_dir):
+        return []
+
+    return sorted(
+        filename for filename in os.listdir(track_data_dir)
+        if filename.startswith("2025H1") and filename.endswith(SUMMARY_SIDECAR_SUFFIXES)
+    )
+
+
+def fresh_summary_sidecars(track_data_dir=TRACK_DATA_DIR):
+    """赛道Excel文件名 -> 同名元数据文件名（优先 .summary.json，其次Parquet副本），只包含修改时间不早于Excel的文件
+
+    重新生成Excel但没有更新元数据时，旧的元数据不再使用。
+    """
+    sidecars = set(list_summary_sidecars(track_data_dir))
+    fresh = {}
+    for filename in list_track_files(track_data_dir):
+        for suffix in SUMMARY_SIDECAR_SUFFIXES:
+            sidecar = filename[:-len('.xlsx')] + suffix
+            if sidecar not in sidecars:
+                continue
+            try:
+                if (os.path.getmtime(os.path.join(track_data_dir, sidecar))
+                        >= os.path.getmtime(os.path.join(track_data_dir, filename))):
+                    fresh[filename] = sidecar
+                    break
+            except OSError:
+                continue
+    return fresh
+
+
+def read_summary_sidecar(path):
+    """读取元数据文件中的赛道总和行：.summary.json 直接解析，Parquet副本只读取文件元数据（需要pyarrow）"""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        metadata = pq.read_schema(path).metadata or {}
+        if PARQUET_SUMMARY_KEY not in metadata:
+            raise ValueError("Parquet文件元数据中没有赛道总和行")
+        return json.loads(metadata[PARQUET_SUMMARY_KEY])
+
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def get_loader_workers(max_workers=None):
+    """确定并发读取的worker数量"""
+    if max_workers is None:
+        env_value = os.environ.get(LOADER_WORKERS_ENV, "")
+        max_workers = int(env_value) if env_value.isdigit() else (os.cpu_count() or 1)
+    return max(1, int(max_workers))
+
+
+def _read_track_file(file_path, nrows=None):
+    """读取单个赛道文件，返回(数据, 耗时秒数)；需为模块级函数以便进程池序列化"""
+    start = time.perf_counter()
+    track_df = pd.read_excel(file_path, nrows=nrows)
+    return track_df, time.perf_counter() - start
+
+
+def load_track_files(track_data_dir=TRACK_DATA_DIR, max_workers=None, executor=None, nrows=None, filenames=None):
+    """并发读取所有赛道文件
+
+    Args:
+        track_data_dir: 赛道文件目录
+        max_workers: worker数量，默认读取环境变量 TRACK_LOADER_WORKERS，否则为CPU核数
+        executor: "thread"（默认）或 "process"；Streamlit服务是多线程进程，在其中fork子进程不安全，
+                  进程池只应在命令行等单线程场景下通过参数或 TRACK_LOADER_EXECUTOR=process 显式启用
+        nrows: 每个文件只读取前若干行，None表示读取全部
+        filenames: 只读取这些文件，默认读取目录下全部赛道文件
+
+    Returns:
+        (frames, timings): frames 为 {文件名: DataFrame}，只包含读取成功的文件；
+        timings 为每个文件的读取记录列表，按文件名排序
+    """
+    if filenames is None:
+        filenames = list_track_files(track_data_dir)
+    if not filenames:
+        return {}, []
+
+    workers = min(get_loader_workers(max_workers), len(filenames))
+    executor_kind = (executor or os.environ.get(LOADER_EXECUTOR_ENV) or "thread").lower()
+
+    frames = {}
+    timings = []
+
+    if workers == 1:
+        # 单worker时直接顺序读取，省去进程池启动开销
+        for filename in filenames:
+            read_file = partial(_read_track_file, os.path.join(track_data_dir, filename), nrows)
+            _collect_result(filename, read_file, frames, timings)
+    else:
+        pool_cls = ProcessPoolExecutor if executor_kind == "process" else ThreadPoolExecutor
+        with pool_cls(max_workers=workers) as pool:
+            futures = {
+                pool.submit(_read_track_file, os.path.join(track_data_dir, filename), nrows): filename
+                for filename in filenames
+            }
+            for future in as_completed(futures):
+                _collect_result(futures[future], future.result, frames, timings)
+
+    timings.sort(key=lambda record: record['文件'])
+    return frames, timings
+
+
+def _collect_result(filename, get_result, frames, timings):
+    """收集单个文件的读取结果，单个文件出错不影响其他文件"""
+    try:
+        track_df, elapsed = get_result()
+        frames[filename] = track_df
+        timings.append({'文件': filename, '耗时(秒)': round(elapsed, 3), '行数': len(track_df), '状态': '成功'})
+    except Exception as e:
+        print(f"读取文件 {filename} 时出错: {e}")
+        timings.append({'文件': filename, '耗时(秒)': None, '行数': 0, '状态': f'失败: {e}'})
+
+
+def print_load_timings(timings, total_seconds=None):
+    """打印每个文件的读取耗时"""
+    for record in timings:
+        elapsed = record['耗时(秒)']
+        elapsed_text = f"{elapsed:.3f}s" if elapsed is not None else "-"
+        print(f"  {record['文件']}: {elapsed_text} ({record['行数']} 行, {record['状态']})")
+
+    if total_seconds is not None:
+        slowest = max((r['耗时(秒)'] or 0 for r in timings), default=0)
+        summed = sum(r['耗时(秒)'] or 0 for r in timings)
+        print(f"  总耗时 {total_seconds:.3f}s（单文件最长 {slowest:.3f}s，顺序读取合计 {summed:.3f}s）")
+
+
+def load_all_tracks(track_data_dir=TRACK_DATA_DIR, max_workers=None, executor=None):
+    """并发读取所有赛道文件并合并为一张表（去掉每个文件第一行的总和行）"""
+    frames, _ = load_track_files(track_data_dir, max_workers=max_workers, executor=executor)
+
+    track_frames = [track_df.iloc[1:] for _, track_df in sorted(frames.items()) if len(track_df) > 1]
+    if not track_frames:
+        return pd.DataFrame()
+
+    return pd.concat(track_frames, ignore_index=True)
+
+
+def get_ingest_source():
+    """分块读取的数据源路径，未配置时为空字符串"""
+    return os.environ.get(INGEST_SOURCE_ENV, "")
+
+
+def get_data_version(summary_path=SUMMARY_FILE, track_data_dir=TRACK_DATA_DIR):
+    """根据数据文件的大小和修改时间计算数据版本号，文件变化后版本号随之变化"""
+    digest = hashlib.sha1()
+    track_files = list_track_files(track_data_dir) + list_summary_sidecars(track_data_dir)
+    paths = [summary_path] + [os.path.join(track_data_dir, f) for f in track_files]
+
+    ingest_source = get_ingest_source()
+    if os.path.isdir(ingest_source):
+        paths += [os.path.join(ingest_source, f) for f in sorted(os.listdir(ingest_source))]
+    elif ingest_source:
+        paths.append(ingest_source)
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns};".encode("utf-8"))
+        except OSError:
+            digest.update(f"{path}:missing;".encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+_version_cache = {}
+_version_cache_lock = threading.Lock()
+_key_locks = {}
+
+
+def memoize_by_data_version(func=None, *, persist=False):
+    """按数据版本缓存函数结果（进程内共享，参数需可哈希）
+
+    同一个key并发调用时只计算一次，其余调用方等待结果；
+    数据版本变化后旧版本的缓存会被清理。
+    persist=True 时进程内未命中会先查磁盘缓存（disk_cache），计算结果也写入磁盘，
+    服务重启和其他worker进程可以直接复用；参数需有稳定的repr。
+    """
+    if func is None:
+        return partial(memoize_by_data_version, persist=persist)
+
+    @wraps(func)
+    def wrapper(*args):
+        version = get_data_version()
+        key = (func.__module__, func.__qualname__, version, args)
+        # 用get一次取值：判断和读取之间数据版本变化可能清理掉这个key
+        result = _version_cache.get(key, disk_cache.MISSING)
+        if result is not disk_cache.MISSING:
+            return result
+
+        with _version_cache_lock:
+            key_lock = _key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            result = _version_cache.get(key, disk_cache.MISSING)
+            if result is disk_cache.MISSING:
+                if persist and disk_cache.is_enabled():
+                    result = disk_cache.get(key)
+                if result is disk_cache.MISSING:
+                    try:
+                        result = func(*args)
+                    except Exception:
+                        # 计算失败不留下key锁
+                        with _version_cache_lock:
+                            _key_locks.pop(key, None)
+                        raise
+                    if persist and disk_cache.is_enabled():
+                        disk_cache.put(key, result)
+                with _version_cache_lock:
+                    for stale_key in [k for k in _version_cache if k[2] != version]:
+                        _version_cache.pop(stale_key, None)
+                        _key_locks.pop(stale_key, None)
+                    _version_cache[key] = result
+
+        return result
+
+    return wrapper
+
+
+def read_summary_data(summary_path=SUMMARY_FILE):
+    """读取总表并确保数值列类型正确，增量和增速按月度访问量重新计算"""
+    df = pd.read_excel(summary_path)
+
+    for col in MONTH_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+
+    return apply_growth_metrics(df, MONTH_COLUMNS)
+
+
+@memoize_by_data_version(persist=True)
+def load_summary_data():
+    """加载总表（按数据版本缓存）"""
+    return read_summary_data()
+
+
+@memoize_by_data_version(persist=True)
+def load_track_summaries():
+    """读取各赛道总和数据（按数据版本缓存）
+
+    赛道文件有同名且不早于它的 .summary.json 或Parquet副本时直接读取元数据，
+    其余赛道从Excel文件读取第一行总和数据。
+    """
+    track_files = list_track_files(TRACK_DATA_DIR)
+    sidecars = fresh_summary_sidecars(TRACK_DATA_DIR)
+    stale_files = [filename for filename in track_files if filename not in sidecars]
+
+    rows = {}
+    for filename, sidecar in sidecars.items():
+        try:
+            rows[filename] = read_summary_sidecar(os.path.join(TRACK_DATA_DIR, sidecar))
+        except Exception as e:
+            # 元数据损坏时退回读取Excel
+            print(f"读取文件 {sidecar} 时出错: {e}")
+            stale_files.append(filename)
+
+    if stale_files:
+        # 并发读取缺少可用元数据的赛道文件，每个文件只需要第一行（总和行）
+        frames, timings = load_track_files(TRACK_DATA_DIR, nrows=1, filenames=sorted(stale_files))
+        print_load_timings(timings)
+        for filename, track_df in frames.items():
+            if len(track_df) > 0:
+                rows[filename] = track_df.iloc[0].to_dict()
+
+    track_summary_df = pd.DataFrame([rows[filename] for filename in sorted(rows)]).reset_index(drop=True)
+
+    if track_summary_df.empty:
+        return pd.DataFrame()
+
+    for col in MONTH_COLUMNS:
+        if col in track_summary_df.columns:
+            track_summary_df[col] = pd.to_numeric(track_summary_df[col], errors='coerce').fillna(0)
+
+    return track_summary_df
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    _, load_timings = load_track_files()
+    print(f"读取 {len(load_timings)} 个赛道文件:")
+    print_load_timings(load_timings, time.perf_counter() - start)
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化磁盘缓存
+
+按 (函数, 数据版本, 代码版本, 参数) 把派生结果（总表、聚合表、MoM矩阵、图表对象）
+序列化到本地目录，服务重启或多个worker进程启动后直接读取，不再重复解析Excel和构建图表。
+
+- 代码版本为应用目录下全部 .py 文件内容的哈希，代码变化后旧条目自然失效
+- 写入先落到临时文件再 os.replace，读者不会看到写了一半的文件
+- 读取时更新文件修改时间作为最近使用时间，总大小超过上限时按LRU淘汰
+- 淘汰在文件锁内进行，同一主机上的多个进程可以共享同一目录
+
+缓存文件使用pickle，目录只应由运行仪表板的用户写入。
+
+    TOOLIFY_DISK_CACHE=0            关闭磁盘缓存
+    TOOLIFY_DISK_CACHE_DIR=路径     缓存目录（默认 .cache/toolify）
+    TOOLIFY_DISK_CACHE_MB=256       容量上限
+
+    python disk_cache.py --stats | --clear
+"""
+
+import argparse
+import contextlib
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows下没有fcntl，只依赖原子替换
+    fcntl = None
+
+DISK_CACHE_ENV = "TOOLIFY_DISK_CACHE"
+DISK_CACHE_DIR_ENV = "TOOLIFY_DISK_CACHE_DIR"
+DISK_CACHE_SIZE_ENV = "TOOLIFY_DISK_CACHE_MB"
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "toolify")
+DEFAULT_MAX_MB = 256
+CACHE_SUFFIX = ".pkl"
+# 超过这个时间的临时文件视为写入中断的残留
+STALE_TMP_SECONDS = 3600
+
+# 会改变计算方式的环境变量，取值计入缓存key（分块聚合的数据源、多进程聚合）
+KEY_ENV_VARS = ("TOOLIFY_INGEST_SOURCE", "TOOLIFY_AGGREGATION_WORKERS")
+
+# 未命中标记（缓存的值本身可能是None）
+MISSING = object()
+
+_code_version = None
+
+
+def is_enabled():
+    """是否启用磁盘缓存（默认启用）"""
+    return os.environ.get(DISK_CACHE_ENV, "1").lower() not in ("0", "false", "no")
+
+
+def get_cache_dir():
+    """缓存目录"""
+    return os.environ.get(DISK_CACHE_DIR_ENV, DEFAULT_CACHE_DIR)
+
+
+def get_max_bytes():
+    """缓存容量上限（字节）"""
+    try:
+        return int(float(os.environ.get(DISK_CACHE_SIZE_ENV, DEFAULT_MAX_MB)) * 1024 * 1024)
+    except ValueError:
+        return DEFAULT_MAX_MB * 1024 * 1024
+
+
+def get_code_version():
+    """应用目录下全部 .py 文件内容的哈希（进程内只计算一次）"""
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha1()
+        app_dir = os.path.dirname(os.path.abspath(__file__))
+        for filename in sorted(os.listdir(app_dir)):
+            if filename.endswith('.py'):
+                digest.update(filename.encode('utf-8'))
+                with open(os.path.join(app_dir, filename), 'rb') as f:
+                    digest.update(f.read())
+        _code_version = digest.hexdigest()[:12]
+    return _code_version
+
+
+def cache_path(key):
+    """缓存key对应的文件路径；key需有稳定的repr（字符串、数字及其元组）"""
+    env = tuple(os.environ.get(name, '') for name in KEY_ENV_VARS)
+    digest = hashlib.sha1(f"{get_code_version()}|{env!r}|{key!r}".encode('utf-8')).hexdigest()
+    return os.path.join(get_cache_dir(), digest + CACHE_SUFFIX)
+
+
+@contextlib.contextmanager
+def _locked(cache_dir):
+    """目录级文件锁，用于淘汰等需要独占的操作"""
+    if fcntl is None:
+        yield
+        return
+
+    with open(os.path.join(cache_dir, '.lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def get(key):
+    """读取缓存，未命中或文件损坏时返回 MISSING"""
+    path = cache_path(key)
+    try:
+        with open(path, 'rb') as f:
+            value = pickle.load(f)
+    except FileNotFoundError:
+        return MISSING
+    except Exception:
+        # 文件损坏（如磁盘写满），删除后按未命中处理
+        with contextlib.suppress(OSError):
+            os.remove(path)
+        return MISSING
+
+    # 修改时间作为最近使用时间
+    with contextlib.suppress(OSError):
+        os.utime(path)
+    return value
+
+
+def put(key, value):
+    """原子写入缓存，写入后按容量上限淘汰；序列化失败时跳过"""
+    cache_dir = get_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path(key))
+    except Exception as e:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        print(f"写入磁盘缓存失败: {e}")
+        return
+
+    evict(get_max_bytes())
+
+
+def _list_entries(cache_dir):
+    """列出缓存文件 (路径, 大小, 最近使用时间)"""
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.name.endswith(CACHE_SUFFIX):
+                with contextlib.suppress(FileNotFoundError):
+                    stat = entry.stat()
+                    entries.append((entry.path, stat.st_size, stat.st_mtime))
+    return entries
+
+
+def evict(max_bytes):
+    """总大小超过上限时按最近使用时间从旧到新删除，并清理中断写入的临时文件"""
+    cache_dir = get_cache_dir()
+    if not os.path.isdir(cache_dir):
+        return
+
+    with _locked(cache_dir):
+        now = time.time()
+        with os.scandir(cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.tmp'):
+                    with contextlib.suppress(OSError):
+                        if now - entry.stat().st_mtime > STALE_TMP_SECONDS:
+                            os.remove(entry.path)
+
+        entries = _list_entries(cache_dir)
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total <= max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+
+
+def clear():
+    """删除全部缓存文件"""
+    cache_dir = get_cache_dir()
+    if os.path.isdir(cache_dir):
+        with _locked(cache_dir):
+            for path, _, _ in _list_entries(cache_dir):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+
+
+def cache_stats():
+    """缓存目录的条目数和占用"""
+    cache_dir = get_cache_dir()
+    entries = _list_entries(cache_dir) if os.path.isdir(cache_dir) else []
+    return {
+        '目录': os.path.abspath(cache_dir),
+        '启用': is_enabled(),
+        '代码版本': get_code_version(),
+        '条目数': len(entries),
+        '占用(MB)': round(sum(size for _, size, _ in entries) / (1024 * 1024), 2),
+        '上限(MB)': round(get_max_bytes() / (1024 * 1024), 2),
+    }
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="磁盘缓存管理")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--stats", action="store_true", help="显示缓存占用（默认）")
+    group.add_argument("--clear", action="store_true", help="清空缓存")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.clear:
+        clear()
+        print("磁盘缓存已清空")
+    for key, value in cache_stats().items():
+        print(f"{key}: {value}")
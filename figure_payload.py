@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图表传输体积压缩
+
+Streamlit把Plotly图表序列化为JSON发送到浏览器。compact_figure() 在缓存图表前
+把数值数组按显示精度取整，并改用最小的类型化数组（Plotly的base64二进制编码，
+int8/16/32、float32），每点一份的文字改由 texttemplate 在前端生成。
+各图表的layout中都带有Streamlit主题模板（约3.6KB），前端需要用它套用主题，不能去掉，
+这部分重复内容交给WebSocket压缩处理（serve.py 默认开启）。
+
+    python figure_payload.py       # 各图表压缩前后的字节数报告
+"""
+
+import zlib
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+# 参与压缩的数值属性
+NUMERIC_ATTRIBUTES = ('x', 'y', 'z', 'customdata')
+# 默认保留的小数位数（访问量为整数，增速和环比按1位小数显示）
+DEFAULT_PRECISION = 2
+# Plotly二进制编码支持的整数类型（不支持int64）
+INTEGER_DTYPES = (np.int8, np.int16, np.int32)
+
+
+def payload_bytes(fig):
+    """图表按Streamlit的方式序列化后的字节数"""
+    return len(pio.to_json(fig, validate=False).encode('utf-8'))
+
+
+def deflated_bytes(fig):
+    """序列化后再经deflate压缩的字节数（近似开启WebSocket压缩后的传输量）"""
+    return len(zlib.compress(pio.to_json(fig, validate=False).encode('utf-8'), 6))
+
+
+def compact_array(values, precision=DEFAULT_PRECISION):
+    """数值数组取整并转为能无损表示的最小类型；非数值数组返回None"""
+    try:
+        array = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+    if array.size == 0:
+        return None
+
+    finite = np.isfinite(array)
+    if finite.all() and np.all(np.mod(array, 1) == 0):
+        for dtype in INTEGER_DTYPES:
+            info = np.iinfo(dtype)
+            if array.min() >= info.min and array.max() <= info.max:
+                return array.astype(dtype)
+        # 超出int32时用float64，2^53以内的整数仍然精确
+        return array
+
+    array = np.round(array, precision)
+    as_float32 = array.astype(np.float32)
+    tolerance = 0.5 * 10 ** -precision
+    error = np.abs(as_float32.astype(np.float64) - array)
+    if np.all(error[finite] <= tolerance):
+        return as_float32
+    return array
+
+
+def compact_figure(fig, precision=DEFAULT_PRECISION):
+    """压缩图表中各trace的数值数组（原地修改并返回）"""
+    for trace in fig.data:
+        for attribute in NUMERIC_ATTRIBUTES:
+            if attribute not in trace or trace[attribute] is None:
+                continue
+            compacted = compact_array(trace[attribute], precision)
+            if compacted is not None:
+                trace[attribute] = compacted
+    return fig
+
+
+def payload_report_row(name, fig, precision=DEFAULT_PRECISION):
+    """单个图表压缩前后的字节数"""
+    original = payload_bytes(fig)
+    compact = compact_figure(go.Figure(fig), precision)
+    compact_size = payload_bytes(compact)
+    return {
+        '图表': name,
+        '原始(KB)': round(original / 1024, 2),
+        '压缩编码后(KB)': round(compact_size / 1024, 2),
+        '节省(%)': round((1 - compact_size / original) * 100, 1) if original else 0.0,
+        'WebSocket压缩后(KB)': round(deflated_bytes(compact) / 1024, 2),
+    }
+
+
+def build_payload_report(tracks=None):
+    """全部仪表板图表的体积报告；tracks为空时包含所有重点赛道"""
+    import pandas as pd
+    from streamlit.elements.lib.streamlit_plotly_theme import configure_streamlit_plotly_theme
+
+    from aggregates import KEY_TRACKS, get_mom_matrix, get_track_data
+    from charts import (create_growth_distribution_chart, create_mom_heatmap, create_track_dual_axis_chart,
+                        create_track_growth_histogram, create_track_mom_chart, create_track_trend_chart)
+    from data_loader import load_summary_data
+
+    # 与仪表板一样使用Streamlit主题模板
+    configure_streamlit_plotly_theme()
+
+    df = load_summary_data()
+    rows = [
+        payload_report_row('MoM热力图', create_mom_heatmap(get_mom_matrix())),
+        payload_report_row('增长率分布', create_growth_distribution_chart(df)),
+    ]
+    builders = [
+        ('趋势', create_track_trend_chart),
+        ('环比', create_track_mom_chart),
+        ('双轴', create_track_dual_axis_chart),
+        ('增长率分布', create_track_growth_histogram),
+    ]
+    for track_name in tracks or KEY_TRACKS:
+        track_data = get_track_data(df, track_name)
+        for label, builder in builders:
+            rows.append(payload_report_row(f"{track_name} {label}", builder(track_data, track_name)))
+
+    report = pd.DataFrame(rows)
+    total = report[['原始(KB)', '压缩编码后(KB)', 'WebSocket压缩后(KB)']].sum()
+    report.loc[len(report)] = {
+        '图表': '合计',
+        '原始(KB)': round(total['原始(KB)'], 2),
+        '压缩编码后(KB)': round(total['压缩编码后(KB)'], 2),
+        '节省(%)': round((1 - total['压缩编码后(KB)'] / total['原始(KB)']) * 100, 1),
+        'WebSocket压缩后(KB)': round(total['WebSocket压缩后(KB)'], 2),
+    }
+    return report
+
+
+if __name__ == "__main__":
+    print(build_payload_report().to_string(index=False))
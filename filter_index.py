@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+筛选索引
+
+每个数据版本只构建一次：每个赛道和每个标签一个位图（np.packbits 压缩，每个工具1位），
+6月访问量和增速各一份排序索引。任意筛选组合先用二分查找把数值区间转换为位图，
+再与赛道/标签位图做按位与/或，得到筛选后的行号，不需要对整表逐列比较。
+
+筛选后的数据按 (数据版本, 筛选条件) 放在容量有限的LRU缓存中，
+筛选组合不会无限占用进程内的共享缓存。
+"""
+
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from data_loader import get_data_version, load_summary_data, memoize_by_data_version
+from formatting import parse_growth_rates
+
+# 筛选条件：最低6月访问量、增速区间（含端点，增速为N/A的工具不命中）、赛道集合、标签集合（命中任一标签即可）
+FilterSet = namedtuple('FilterSet', ['min_visits', 'growth_range', 'tracks', 'tags'])
+
+VISITS_COLUMN = '2025年6月访问量'
+GROWTH_COLUMN = '2025H1访问量增速'
+# 至少出现在这么多个工具中的标签才建立位图
+MIN_TAG_TOOLS = 2
+# 筛选后数据的缓存容量
+FILTERED_CACHE_SIZE = 32
+
+_filtered_cache = OrderedDict()
+_filtered_cache_lock = threading.Lock()
+
+
+def make_filters(min_visits=0, growth_range=None, tracks=(), tags=()):
+    """规范化筛选条件，没有任何有效条件时返回None"""
+    filters = FilterSet(
+        min_visits=float(min_visits or 0),
+        growth_range=tuple(float(bound) for bound in growth_range) if growth_range else None,
+        tracks=tuple(sorted(tracks)),
+        tags=tuple(sorted(tags)),
+    )
+    if not filters.min_visits and filters.growth_range is None and not filters.tracks and not filters.tags:
+        return None
+    return filters
+
+
+def _bitmap(n_rows, positions):
+    """行号集合 -> 压缩位图"""
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[positions] = True
+    return np.packbits(mask)
+
+
+def split_tags(tags):
+    """拆分逗号分隔的标签列，返回 (行号, 标签) 两个数组"""
+    exploded = tags.fillna('').astype(str).str.split(r'\s*[,，]\s*').explode()
+    exploded = exploded[exploded.str.len() > 0]
+    return exploded.index.to_numpy(), exploded.to_numpy()
+
+
+def build_filter_index(df):
+    """构建筛选索引
+
+    Returns:
+        dict: n_rows、all（全体位图）、track_bitmaps、tag_bitmaps、
+              tag_options（按工具数降序的标签列表）以及数值列的排序索引 sorted（列 -> (行号, 有序值)，
+              不含缺失值）
+    """
+    df = df.reset_index(drop=True)
+    n_rows = len(df)
+
+    track_codes, track_labels = pd.factorize(df['赛道分类'].astype(str))
+    track_bitmaps = {label: _bitmap(n_rows, np.flatnonzero(track_codes == code))
+                     for code, label in enumerate(track_labels)}
+
+    tag_bitmaps = {}
+    tag_counts = {}
+    if 'Tags' in df.columns:
+        rows, tags = split_tags(df['Tags'])
+        tag_codes, tag_labels = pd.factorize(tags)
+        order = np.argsort(tag_codes, kind='stable')
+        boundaries = np.flatnonzero(np.diff(tag_codes[order])) + 1
+        for chunk in np.split(order, boundaries):
+            tool_rows = np.unique(rows[chunk])
+            if len(tool_rows) >= MIN_TAG_TOOLS:
+                tag = tag_labels[tag_codes[chunk[0]]]
+                tag_bitmaps[tag] = _bitmap(n_rows, tool_rows)
+                tag_counts[tag] = len(tool_rows)
+
+    numeric = {
+        VISITS_COLUMN: pd.to_numeric(df[VISITS_COLUMN], errors='coerce').fillna(0).to_numpy(dtype=np.float64),
+        # 增速为N/A的工具不进入排序索引，设置增速区间时不会被当作0命中
+        GROWTH_COLUMN: parse_growth_rates(df[GROWTH_COLUMN]).to_numpy(dtype=np.float64),
+    }
+    sorted_index = {}
+    for column, values in numeric.items():
+        order = np.flatnonzero(~np.isnan(values))
+        order = order[np.argsort(values[order], kind='stable')]
+        sorted_index[column] = (order, values[order])
+
+    return {
+        'n_rows': n_rows,
+        'all': _bitmap(n_rows, np.arange(n_rows)),
+        'track_bitmaps': track_bitmaps,
+        'tag_bitmaps': tag_bitmaps,
+        'tag_options': sorted(tag_counts, key=lambda tag: (-tag_counts[tag], tag)),
+        'sorted': sorted_index,
+    }
+
+
+def range_bitmap(index, column, low=None, high=None):
+    """数值在 [low, high] 区间内的行的位图（二分查找有序值，缺失值的行不会命中）"""
+    order, values = index['sorted'][column]
+    start = 0 if low is None else np.searchsorted(values, low, side='left')
+    end = len(values) if high is None else np.searchsorted(values, high, side='right')
+    return _bitmap(index['n_rows'], order[start:end])
+
+
+def _union(bitmaps, empty):
+    result = empty.copy()
+    for bitmap in bitmaps:
+        np.bitwise_or(result, bitmap, out=result)
+    return result
+
+
+def resolve_filters(index, filters):
+    """筛选条件 -> 满足全部条件的行的位图"""
+    result = index['all'].copy()
+    if filters is None:
+        return result
+
+    empty = np.zeros_like(result)
+    if filters.min_visits:
+        np.bitwise_and(result, range_bitmap(index, VISITS_COLUMN, low=filters.min_visits), out=result)
+    if filters.growth_range is not None:
+        low, high = filters.growth_range
+        np.bitwise_and(result, range_bitmap(index, GROWTH_COLUMN, low, high), out=result)
+    if filters.tracks:
+        tracks = _union((index['track_bitmaps'][track] for track in filters.tracks
+                         if track in index['track_bitmaps']), empty)
+        np.bitwise_and(result, tracks, out=result)
+    if filters.tags:
+        tags = _union((index['tag_bitmaps'][tag] for tag in filters.tags if tag in index['tag_bitmaps']), empty)
+        np.bitwise_and(result, tags, out=result)
+    return result
+
+
+def filter_positions(index, filters):
+    """满足筛选条件的行号（升序）"""
+    return np.flatnonzero(np.unpackbits(resolve_filters(index, filters), count=index['n_rows']))
+
+
+@memoize_by_data_version
+def get_filter_index():
+    """总表的筛选索引（按数据版本缓存）"""
+    return build_filter_index(load_summary_data())
+
+
+def get_filtered_data(filters):
+    """筛选后的总表（行顺序与原表一致）；filters为None时返回完整总表"""
+    df = load_summary_data()
+    if filters is None:
+        return df
+
+    key = (get_data_version(), filters)
+    with _filtered_cache_lock:
+        if key in _filtered_cache:
+            _filtered_cache.move_to_end(key)
+            return _filtered_cache[key]
+
+    filtered = df.iloc[filter_positions(get_filter_index(), filters)]
+
+    with _filtered_cache_lock:
+        _filtered_cache[key] = filtered
+        while len(_filtered_cache) > FILTERED_CACHE_SIZE:
+            _filtered_cache.popitem(last=False)
+    return filtered
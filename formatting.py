@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数字和增长率的统一格式化函数
+"""
+
+import pandas as pd
+
+
+def format_number(num, is_percentage=False):
+    """统一的数字格式化函数"""
+    if pd.isna(num) or num == 0:
+        return "0" if not is_percentage else "0.0%"
+
+    if is_percentage:
+        return f"{num:.1f}%"
+    else:
+        # 访问量和增量使用千分位，不保留小数，统一使用B、M、K格式
+        # 处理负数
+        is_negative = num < 0
+        abs_num = abs(num)
+
+        if abs_num >= 1e9:
+            formatted = f"{abs_num/1e9:.1f}B"
+        elif abs_num >= 1e6:
+            formatted = f"{abs_num/1e6:.1f}M"
+        elif abs_num >= 1e3:
+            formatted = f"{abs_num/1e3:.0f}K"
+        else:
+            # 小于1000的数字显示完整数字
+            formatted = f"{abs_num:.0f}"
+
+        # 添加负号
+        return f"-{formatted}" if is_negative else formatted
+
+def format_growth_rate(rate_str):
+    """格式化增长率字符串"""
+    if pd.isna(rate_str) or rate_str == 'N/A':
+        return "0.0%"
+
+    if isinstance(rate_str, str):
+        # 移除百分号并转换为数字
+        clean_rate = rate_str.replace('%', '').strip()
+        try:
+            rate_num = float(clean_rate)
+            return f"{rate_num:.1f}%"
+        except:
+            return "0.0%"
+    else:
+        try:
+            return f"{float(rate_str):.1f}%"
+        except:
+            return "0.0%"
+
+def parse_growth_rates(growth_series):
+    """将增速字符串列（如 "42.1%"）转换为数值，缺失增速（None/NaN或 "N/A"）记为NaN，需要按0计时由调用方fillna"""
+    growth_data = growth_series.astype(str).str.replace('%', '')
+    return pd.to_numeric(growth_data, errors='coerce')
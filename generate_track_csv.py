@@ -2,44 +2,132 @@
 # -*- coding: utf-8 -*-
 """
 根据赛道分类生成分组Excel文件
+
+默认使用openpyxl的只写模式逐行写出，不在内存中保留整个工作簿对象模型，
+每个赛道的峰值内存基本持平。可选同时输出CSV/Parquet副本，副本只包含工具行，
+赛道总和行作为元数据单独保存（CSV写入同名 .summary.json，Parquet写入文件元数据）。
 """
 
-import pandas as pd
+import argparse
+import json
 import os
 
-def generate_track_excel_files():
-    """根据赛道分类生成Excel文件"""
-    
+import pandas as pd
+from openpyxl import Workbook
+
+from data_loader import MONTH_COLUMNS, PARQUET_SUMMARY_KEY
+from growth_metrics import apply_growth_metrics, compute_growth_metrics, format_growth_rates
+
+# 默认输出目录
+DEFAULT_OUTPUT_DIR = "/Users/blackfischer/Downloads/Toolify/toolify_dashboard/data/2025H1"
+
+
+def _json_default(value):
+    """将numpy标量转换为可JSON序列化的Python类型"""
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"无法序列化类型 {type(value)}")
+
+
+def write_track_excel_streaming(excel_path, columns, summary_row, track_data):
+    """以只写模式逐行写出赛道Excel文件：表头、总和行、工具行"""
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+
+    worksheet.append(list(columns))
+    worksheet.append([summary_row.get(col) for col in columns])
+
+    for row in track_data[list(columns)].itertuples(index=False, name=None):
+        worksheet.append([None if pd.isna(value) else value for value in row])
+
+    workbook.save(excel_path)
+
+
+def write_track_excel_pandas(excel_path, summary_row, track_data):
+    """原有写法：将总和行拼接到第一行后整体写出"""
+    summary_df = pd.DataFrame([summary_row])
+    final_data = pd.concat([summary_df, track_data], ignore_index=True)
+    final_data.to_excel(excel_path, index=False, engine='openpyxl')
+
+
+def write_summary_sidecar(sidecar_path, summary_row):
+    """将赛道总和行写入JSON元数据文件"""
+    with open(sidecar_path, 'w', encoding='utf-8') as f:
+        json.dump(summary_row, f, ensure_ascii=False, indent=2, default=_json_default)
+
+
+def write_track_csv(csv_path, summary_row, track_data):
+    """输出CSV副本（仅工具行），总和行写入同名 .summary.json"""
+    track_data.to_csv(csv_path, index=False, encoding='utf-8')
+    write_summary_sidecar(csv_path[:-len('.csv')] + '.summary.json', summary_row)
+
+
+def write_track_parquet(parquet_path, summary_row, track_data):
+    """输出Parquet副本（仅工具行），总和行保存在文件元数据中；需要安装pyarrow"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(track_data, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[PARQUET_SUMMARY_KEY] = json.dumps(summary_row, ensure_ascii=False, default=_json_default).encode('utf-8')
+    pq.write_table(table.replace_schema_metadata(metadata), parquet_path)
+
+
+def remove_track_files(output_dir, tracks, suffixes=('.xlsx', '.csv', '.parquet', '.summary.json')):
+    """删除指定赛道的分赛道文件及其副本和元数据，返回已删除的路径"""
+    removed = []
+    for track_name in tracks:
+        for suffix in suffixes:
+            path = os.path.join(output_dir, f"2025H1{track_name}{suffix}")
+            if os.path.exists(path):
+                os.remove(path)
+                removed.append(path)
+    return removed
+
+
+def generate_track_excel_files(input_path='toolify_processed_2025_summary.xlsx', output_dir=DEFAULT_OUTPUT_DIR,
+                               writer='streaming', side_formats=(), tracks=None):
+    """根据赛道分类生成Excel文件
+
+    Args:
+        input_path: 总表路径
+        output_dir: 输出目录
+        writer: "streaming"（只写模式逐行写出）或 "pandas"（原有整表写出）
+        side_formats: 额外输出的副本格式，可包含 "csv"、"parquet"
+        tracks: 只生成这些赛道（如 snapshot_diff.py 给出的受影响赛道），为空时生成全部
+    """
+
     # 读取处理后的Excel文件
     print("读取Excel文件...")
-    df = pd.read_excel('toolify_processed_2025_summary.xlsx')
-    
+    df = pd.read_excel(input_path)
+
     print(f"总共读取了 {len(df)} 条记录")
-    
+
+    # 按月度访问量重新计算每个工具的半年访问增量和增速
+    df = apply_growth_metrics(df, MONTH_COLUMNS)
+
     # 按赛道分类分组
     print("\n按赛道分类分组...")
     track_groups = df.groupby('赛道分类')
-    
+
     print(f"共有 {len(track_groups)} 个赛道分类:")
     for track_name, group in track_groups:
         print(f"  {track_name}: {len(group)} 个工具")
-    
+
     # 创建输出目录（如果不存在）
-    output_dir = "/Users/blackfischer/Downloads/Toolify/toolify_dashboard/data/2025H1"
     os.makedirs(output_dir, exist_ok=True)
-    
+
     print(f"\n开始生成Excel文件到 {output_dir} 目录...")
-    
+
     # 为每个赛道生成Excel文件
-    for track_name, group_data in track_groups:
+    for track_name, track_data in track_groups:
+        if tracks is not None and track_name not in tracks:
+            continue
         try:
-            # 准备数据
-            track_data = group_data.copy()
-            
             # 计算总和行，包括2025H1访问量增速
             # 计算半年访问增量总和
             total_increment = track_data['半年访问增量'].sum()
-            
+
             # 计算各月访问量总和
             total_jan = track_data['2025年1月访问量'].sum()
             total_feb = track_data['2025年2月访问量'].sum()
@@ -47,29 +135,12 @@ def generate_track_excel_files():
             total_apr = track_data['2025年4月访问量'].sum()
             total_may = track_data['2025年5月访问量'].sum()
             total_jun = track_data['2025年6月访问量'].sum()
-            
-            # 计算该赛道的2025H1访问量增速
-            # 找到最早有访问量的月份和最晚有访问量的月份
+
+            # 计算该赛道的2025H1访问量增速（最早与最晚非零月份之比）
             monthly_totals = [total_jan, total_feb, total_mar, total_apr, total_may, total_jun]
-            monthly_names = ['1月', '2月', '3月', '4月', '5月', '6月']
-            
-            # 找到第一个和最后一个非零月份
-            earliest_visit = 0
-            latest_visit = 0
-            
-            for i, total in enumerate(monthly_totals):
-                if total > 0:
-                    if earliest_visit == 0:
-                        earliest_visit = total
-                    latest_visit = total
-            
-            # 计算增速
-            if earliest_visit > 0 and latest_visit != earliest_visit:
-                growth_rate = ((latest_visit - earliest_visit) / earliest_visit) * 100
-                h1_growth_rate = f"{growth_rate:.1f}%"
-            else:
-                h1_growth_rate = "N/A"
-            
+            growth_rate = compute_growth_metrics(monthly_totals)['growth_rate']
+            h1_growth_rate = format_growth_rates(growth_rate, missing="N/A")[0]
+
             summary_row = {
                 'Tools名称': f'{track_name}赛道总和',
                 '半年访问增量': total_increment,
@@ -84,33 +155,55 @@ def generate_track_excel_files():
                 'Tags': '',
                 '赛道分类': track_name
             }
-            
-            # 将总和行添加到数据框的第一行
-            summary_df = pd.DataFrame([summary_row])
-            final_data = pd.concat([summary_df, track_data], ignore_index=True)
-            
+
             # 生成Excel文件名
-            excel_filename = f"2025H1{track_name}.xlsx"
+            base_filename = f"2025H1{track_name}"
+            excel_filename = f"{base_filename}.xlsx"
             excel_path = os.path.join(output_dir, excel_filename)
-            
-            # 保存Excel文件
-            final_data.to_excel(excel_path, index=False, engine='openpyxl')
-            
+
+            # 保存Excel文件（总和行位于第一行）
+            if writer == 'pandas':
+                write_track_excel_pandas(excel_path, summary_row, track_data)
+            else:
+                write_track_excel_streaming(excel_path, df.columns, summary_row, track_data)
+
             print(f"✅ 已生成: {excel_filename} ({len(track_data)} 个工具 + 1 个总和行)")
-            
+
+            # 可选的CSV/Parquet副本
+            if 'csv' in side_formats:
+                write_track_csv(os.path.join(output_dir, f"{base_filename}.csv"), summary_row, track_data)
+                print(f"   └ CSV副本: {base_filename}.csv")
+            if 'parquet' in side_formats:
+                write_track_parquet(os.path.join(output_dir, f"{base_filename}.parquet"), summary_row, track_data)
+                print(f"   └ Parquet副本: {base_filename}.parquet")
+
         except Exception as e:
             print(f"❌ 生成 {track_name} 的Excel文件时出错: {e}")
-    
+
     print(f"\n🎉 所有Excel文件已生成完成！")
     print(f"文件位置: {os.path.abspath(output_dir)}")
-    
+
     # 列出生成的文件
     print("\n生成的文件列表:")
     for filename in sorted(os.listdir(output_dir)):
-        if filename.endswith('.xlsx'):
+        if filename.endswith(('.xlsx', '.csv', '.parquet')):
             file_path = os.path.join(output_dir, filename)
             file_size = os.path.getsize(file_path)
             print(f"  {filename} ({file_size:,} bytes)")
 
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="根据赛道分类生成分组Excel文件")
+    parser.add_argument("--input", default="toolify_processed_2025_summary.xlsx", help="总表路径")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="输出目录")
+    parser.add_argument("--writer", choices=["streaming", "pandas"], default="streaming",
+                        help="Excel写出方式：streaming为只写模式逐行写出，pandas为原有整表写出")
+    parser.add_argument("--format", dest="side_formats", action="append", choices=["csv", "parquet"], default=[],
+                        help="额外输出的副本格式，可重复指定")
+    parser.add_argument("--track", dest="tracks", action="append", default=None,
+                        help="只生成指定赛道，可重复指定")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    generate_track_excel_files()
\ No newline at end of file
+    args = parse_args()
+    generate_track_excel_files(args.input, args.output_dir, args.writer, args.side_formats, args.tracks)
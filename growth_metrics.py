@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+访问量增长指标的向量化计算
+
+对 工具数 × 月份 的访问量矩阵一次性计算：最早/最晚非零月份、
+2025H1访问量增速 (最晚月份-最早月份)/最早月份 × 100%、按月复合增速和绝对增量。
+generate_track_csv.py（赛道总和行）和仪表板加载总表时共用，不再逐行循环或直接信任上游字符串。
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def compute_growth_metrics(monthly_values):
+    """计算增长指标
+
+    Args:
+        monthly_values: 形状为 (工具数, 月份数) 的访问量矩阵，月份按时间先后排列；
+                        一维数组视为单个工具
+
+    Returns:
+        dict，各项均为长度为工具数的数组：
+            has_visits: 是否存在非零月份
+            earliest_index / latest_index: 最早/最晚非零月份下标（无访问量时为-1）
+            earliest / latest: 最早/最晚非零月份访问量（无访问量时为0）
+            increment: 绝对增量 latest - earliest
+            growth_rate: 增速百分比，非零月份少于两个时为NaN
+            monthly_cagr: 按月复合增速百分比，非零月份少于两个时为NaN
+    """
+    values = np.atleast_2d(np.asarray(monthly_values, dtype=np.float64))
+    values = np.nan_to_num(values, nan=0.0)
+    n_months = values.shape[1]
+    rows = np.arange(values.shape[0])
+
+    nonzero = values > 0
+    has_visits = nonzero.any(axis=1)
+    earliest_index = np.where(has_visits, nonzero.argmax(axis=1), -1)
+    latest_index = np.where(has_visits, n_months - 1 - nonzero[:, ::-1].argmax(axis=1), -1)
+
+    earliest = np.where(has_visits, values[rows, np.maximum(earliest_index, 0)], 0.0)
+    latest = np.where(has_visits, values[rows, np.maximum(latest_index, 0)], 0.0)
+    increment = latest - earliest
+
+    # 至少两个非零月份才有增速，只有一个非零月份时与上游数据一致记为N/A
+    span = latest_index - earliest_index
+    has_span = has_visits & (span > 0)
+    safe_earliest = np.where(has_visits, earliest, 1.0)
+    growth_rate = np.where(has_span, increment / safe_earliest * 100, np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = latest / safe_earliest
+        monthly_cagr = np.where(has_span, (np.power(ratio, 1.0 / np.maximum(span, 1)) - 1) * 100, np.nan)
+
+    return {
+        'has_visits': has_visits,
+        'earliest_index': earliest_index,
+        'latest_index': latest_index,
+        'earliest': earliest,
+        'latest': latest,
+        'increment': increment,
+        'growth_rate': growth_rate,
+        'monthly_cagr': monthly_cagr,
+    }
+
+
+def format_growth_rates(growth_rate, missing="N/A"):
+    """将增速数组格式化为 "42.1%" 形式的字符串数组，NaN替换为 missing"""
+    growth_rate = np.asarray(growth_rate, dtype=np.float64)
+    formatted = np.char.mod('%.1f%%', np.nan_to_num(growth_rate)).astype(object)
+    formatted[np.isnan(growth_rate)] = missing
+    return formatted
+
+
+def apply_growth_metrics(df, month_columns):
+    """根据月度访问量重新计算 半年访问增量 和 2025H1访问量增速 列（原地修改并返回）
+
+    非零月份少于两个的工具增速记为缺失值，与上游数据一致，不参与平均增速计算。
+    """
+    metrics = compute_growth_metrics(df[month_columns].to_numpy())
+    increment = metrics['increment']
+    if all(pd.api.types.is_integer_dtype(df[col]) for col in month_columns):
+        increment = increment.astype(np.int64)
+
+    df['半年访问增量'] = increment
+    df['2025H1访问量增速'] = pd.Series(format_growth_rates(metrics['growth_rate'], missing=None), index=df.index)
+    return df
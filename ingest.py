@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分块读取与增量聚合
+
+超出单机内存的工具目录按行分批读取（CSV、Parquet，或 generate_track_csv.py
+输出的分赛道副本目录），每批只保留聚合所需的列，逐批更新各赛道的工具数、
+月度访问量合计、增量合计、增速均值、增速分位数草图（KLL，见 quantile_sketch.py）和增速直方图。完整数据从不同时驻留内存，
+总览表、MoM热力图和增速分布图都可以从聚合状态得到；各赛道按6月访问量和
+半年访问增量的TOP K工具由有界堆维护（见 topk.py），赛道详情页的排行同样无需明细数据。
+
+聚合状态可以合并，便于按文件或分片并行处理后汇总。
+
+    python ingest.py data/2025H1 --batch-size 50000
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from aggregates import GROWTH_QUANTILES
+from data_loader import MONTH_COLUMNS, get_ingest_source, memoize_by_data_version
+from growth_metrics import compute_growth_metrics, format_growth_rates
+from quantile_sketch import merge_sketches, new_sketch, sketch_quantiles, update_sketch
+from topk import TOPK_SIZE, merge_topk, new_topk, topk_records, update_topk
+
+DEFAULT_BATCH_SIZE = 50_000
+
+# 聚合只需要这些列
+INGEST_COLUMNS = ['Tools名称', '赛道分类'] + MONTH_COLUMNS
+
+# 维护TOP K的排序字段
+TOPK_COLUMNS = ('2025年6月访问量', '半年访问增量')
+# TOP K记录的字段
+TOPK_RECORD_COLUMNS = ['Tools名称'] + MONTH_COLUMNS + ['半年访问增量', '增速数值']
+
+# 增速直方图：-100% ~ 1000% 按1%分箱，另加下溢/上溢两个箱
+GROWTH_BIN_EDGES = np.arange(-100, 1001, 1, dtype=np.float64)
+GROWTH_BIN_COUNT = len(GROWTH_BIN_EDGES) + 1
+
+SUPPORTED_SUFFIXES = ('.csv', '.parquet')
+
+
+def list_source_files(source):
+    """展开数据源：目录返回其中的CSV/Parquet文件（同名时优先Parquet），文件原样返回"""
+    if not os.path.isdir(source):
+        return [source]
+
+    by_stem = {}
+    for filename in sorted(os.listdir(source)):
+        stem, suffix = os.path.splitext(filename)
+        if suffix in SUPPORTED_SUFFIXES and (stem not in by_stem or suffix == '.parquet'):
+            by_stem[stem] = os.path.join(source, filename)
+    return [by_stem[stem] for stem in sorted(by_stem)]
+
+
+def iter_file_batches(path, batch_size=DEFAULT_BATCH_SIZE, columns=INGEST_COLUMNS):
+    """按行分批读取单个CSV/Parquet/Excel文件，每批为只含所需列的DataFrame"""
+    if path.endswith('.csv'):
+        yield from pd.read_csv(path, chunksize=batch_size, usecols=columns)
+
+    elif path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        for record_batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            yield record_batch.to_pandas()
+
+    elif path.endswith('.xlsx'):
+        # openpyxl只读模式逐行读取，适用于总表；分赛道Excel第一行为总和行，请改用CSV/Parquet副本
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = list(next(rows))
+            positions = [header.index(col) for col in columns]
+            batch = []
+            for row in rows:
+                batch.append([row[pos] for pos in positions])
+                if len(batch) >= batch_size:
+                    yield pd.DataFrame(batch, columns=columns)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=columns)
+        finally:
+            workbook.close()
+
+    else:
+        raise ValueError(f"不支持的文件类型: {path}")
+
+
+def iter_batches(source, batch_size=DEFAULT_BATCH_SIZE, columns=INGEST_COLUMNS):
+    """按行分批读取数据源（文件或目录）"""
+    for path in list_source_files(source):
+        yield from iter_file_batches(path, batch_size, columns)
+
+
+def new_aggregation(top_k=TOPK_SIZE):
+    """创建空的聚合状态"""
+    return {'rows': 0, 'tracks': {}, 'top': new_topk(TOPK_COLUMNS, top_k)}
+
+
+def _new_track_state():
+    return {
+        'count': 0,
+        'monthly': np.zeros(len(MONTH_COLUMNS), dtype=np.float64),
+        'increment': 0.0,
+        'growth_sum': 0.0,
+        'growth_count': 0,
+        'histogram': np.zeros(GROWTH_BIN_COUNT, dtype=np.int64),
+        'growth_sketch': new_sketch(),
+    }
+
+
+def growth_bin_index(growth_rate):
+    """增速所在的直方图箱下标：0为下溢箱，最后一个为上溢箱"""
+    return np.searchsorted(GROWTH_BIN_EDGES, growth_rate, side='right')
+
+
+def update_aggregation(state, batch):
+    """用一批数据更新聚合状态（原地修改并返回）"""
+    if batch.empty:
+        return state
+
+    monthly = batch[MONTH_COLUMNS].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    metrics = compute_growth_metrics(monthly)
+    # 与总表中 "42.1%" 形式的增速保持一致的精度
+    growth_rate = np.round(metrics['growth_rate'], 1)
+    has_growth = ~np.isnan(growth_rate)
+
+    # 与仪表板一致：均值不含缺失增速，分布图中缺失增速按0计
+    bins = growth_bin_index(np.where(has_growth, growth_rate, 0.0))
+
+    track_codes, track_names = pd.factorize(batch['赛道分类'].astype(str))
+    n_tracks = len(track_names)
+
+    counts = np.bincount(track_codes, minlength=n_tracks)
+    increments = np.bincount(track_codes, weights=metrics['increment'], minlength=n_tracks)
+    growth_sums = np.bincount(track_codes, weights=np.where(has_growth, growth_rate, 0.0), minlength=n_tracks)
+    growth_counts = np.bincount(track_codes, weights=has_growth, minlength=n_tracks)
+    monthly_sums = np.zeros((n_tracks, len(MONTH_COLUMNS)))
+    np.add.at(monthly_sums, track_codes, monthly)
+    histograms = np.bincount(track_codes * GROWTH_BIN_COUNT + bins,
+                             minlength=n_tracks * GROWTH_BIN_COUNT).reshape(n_tracks, GROWTH_BIN_COUNT)
+
+    # 按赛道切分有效增速，逐赛道更新分位数草图
+    growth_order = np.argsort(track_codes[has_growth], kind='stable')
+    growth_by_track = np.split(growth_rate[has_growth][growth_order],
+                               np.cumsum(np.bincount(track_codes[has_growth], minlength=n_tracks))[:-1])
+
+    for code, track_name in enumerate(track_names):
+        track_state = state['tracks'].setdefault(track_name, _new_track_state())
+        update_sketch(track_state['growth_sketch'], growth_by_track[code])
+        track_state['count'] += int(counts[code])
+        track_state['monthly'] += monthly_sums[code]
+        track_state['increment'] += float(increments[code])
+        track_state['growth_sum'] += float(growth_sums[code])
+        track_state['growth_count'] += int(growth_counts[code])
+        track_state['histogram'] += histograms[code]
+
+    names = batch['Tools名称'].tolist()
+    records = [
+        (name, *month_values, increment, growth)
+        for name, month_values, increment, growth in zip(names, monthly.tolist(), metrics['increment'].tolist(),
+                                                         metrics['growth_rate'].tolist())
+    ]
+    scores = {'2025年6月访问量': monthly[:, -1], '半年访问增量': metrics['increment']}
+    row_ids = state['rows'] + np.arange(len(batch))
+    update_topk(state['top'], track_codes, track_names, scores, row_ids, records)
+
+    state['rows'] += len(batch)
+    return state
+
+
+def merge_aggregations(*states):
+    """合并多个聚合状态（如多个分片/worker的结果），返回新的状态
+
+    各状态应按数据源顺序传入，TOP K中同值工具的先后才与整表计算一致。
+    """
+    merged = new_aggregation()
+    row_offsets = []
+    for state in states:
+        row_offsets.append(merged['rows'])
+        merged['rows'] += state['rows']
+        for track_name, track_state in state['tracks'].items():
+            target = merged['tracks'].setdefault(track_name, _new_track_state())
+            target['count'] += track_state['count']
+            target['monthly'] += track_state['monthly']
+            target['increment'] += track_state['increment']
+            target['growth_sum'] += track_state['growth_sum']
+            target['growth_count'] += track_state['growth_count']
+            target['histogram'] += track_state['histogram']
+            target['growth_sketch'] = merge_sketches(target['growth_sketch'], track_state['growth_sketch'])
+
+    if states:
+        merged['top'] = merge_topk([state['top'] for state in states], row_offsets)
+    return merged
+
+
+def aggregate_source(source, batch_size=DEFAULT_BATCH_SIZE):
+    """分块读取整个数据源并返回聚合状态"""
+    state = new_aggregation()
+    for batch in iter_batches(source, batch_size):
+        update_aggregation(state, batch)
+    return state
+
+
+def aggregation_to_track_table(state):
+    """聚合状态转为与 calculate_track_aggregates() 相同结构的赛道聚合表"""
+    rows = []
+    for track_name, track_state in state['tracks'].items():
+        rows.append({
+            '赛道分类': track_name,
+            '工具数量': track_state['count'],
+            '6月总访问量': track_state['monthly'][-1],
+            '半年总增量': track_state['increment'],
+            '平均增速': track_state['growth_sum'] / track_state['growth_count'] if track_state['growth_count'] else np.nan,
+            '增速中位数': sketch_quantiles(track_state['growth_sketch'], 0.5)[0],
+        })
+
+    if not rows:
+        return pd.DataFrame(columns=['工具数量', '6月总访问量', '半年总增量', '平均增速', '增速中位数'])
+
+    track_table = pd.DataFrame(rows).set_index('赛道分类').round(1)
+    return track_table.sort_values('6月总访问量', ascending=False)
+
+
+def aggregation_to_track_summaries(state):
+    """聚合状态转为赛道总和行（赛道分类 + 各月访问量），可直接用于 calculate_mom_matrix()"""
+    rows = [
+        {'赛道分类': track_name, **dict(zip(MONTH_COLUMNS, track_state['monthly']))}
+        for track_name, track_state in state['tracks'].items()
+    ]
+    return pd.DataFrame(rows, columns=['赛道分类'] + MONTH_COLUMNS)
+
+
+def aggregation_to_overall_metrics(state):
+    """聚合状态转为与 calculate_overall_metrics() 相同结构的核心指标"""
+    tracks = state['tracks'].values()
+    growth_count = sum(track_state['growth_count'] for track_state in tracks)
+    return {
+        '工具总数': sum(track_state['count'] for track_state in tracks),
+        '6月总访问量': sum(track_state['monthly'][-1] for track_state in tracks),
+        '半年总增量': sum(track_state['increment'] for track_state in tracks),
+        '平均增速': sum(track_state['growth_sum'] for track_state in tracks) / growth_count if growth_count else np.nan,
+        **aggregation_growth_quantiles(state),
+    }
+
+
+def aggregation_growth_quantiles(state, track_name=None):
+    """增速分位数估计（GROWTH_QUANTILES）；track_name为空时合并全部赛道的草图"""
+    if track_name is not None:
+        track_state = state['tracks'].get(track_name)
+        sketch = track_state['growth_sketch'] if track_state else new_sketch()
+    else:
+        sketch = merge_sketches(*(track_state['growth_sketch'] for track_state in state['tracks'].values()))
+    return dict(zip(GROWTH_QUANTILES, sketch_quantiles(sketch, list(GROWTH_QUANTILES.values()))))
+
+
+def aggregation_growth_histogram(state, track_name=None):
+    """返回增速直方图 (分箱边界, 各箱计数)；track_name为空时为全部赛道合计
+
+    计数数组比边界多一个元素：counts[0] 为小于 -100% 的下溢箱，counts[-1] 为不小于1000%的上溢箱，
+    counts[i] 对应 [edges[i-1], edges[i])。
+    """
+    if track_name is not None:
+        track_state = state['tracks'].get(track_name)
+        counts = track_state['histogram'].copy() if track_state else np.zeros(GROWTH_BIN_COUNT, dtype=np.int64)
+    else:
+        counts = np.zeros(GROWTH_BIN_COUNT, dtype=np.int64)
+        for track_state in state['tracks'].values():
+            counts += track_state['histogram']
+    return GROWTH_BIN_EDGES, counts
+
+
+def aggregation_to_track_metrics(state, track_name):
+    """单个赛道与 calculate_overall_metrics() 相同结构的核心指标"""
+    track_state = state['tracks'].get(track_name)
+    if track_state is None:
+        return {'工具总数': 0, '6月总访问量': 0, '半年总增量': 0, '平均增速': np.nan,
+                **dict.fromkeys(GROWTH_QUANTILES, np.nan)}
+    return aggregation_to_overall_metrics({'tracks': {track_name: track_state}})
+
+
+def aggregation_top_tools(state, track_name, top_n=None, sort_column='2025年6月访问量'):
+    """赛道TOP N工具，列与总表一致（含各月访问量），顺序与 nlargest 相同；top_n不超过状态的K"""
+    records = topk_records(state['top'], sort_column, track_name, top_n)
+    top_tools = pd.DataFrame(records, columns=TOPK_RECORD_COLUMNS)
+    top_tools['2025H1访问量增速'] = pd.Series(
+        format_growth_rates(top_tools['增速数值'].to_numpy(dtype=np.float64), missing=None), index=top_tools.index)
+    top_tools['赛道分类'] = track_name
+    return top_tools.drop(columns='增速数值')
+
+
+def aggregation_track_monthly(state, track_name):
+    """赛道各月访问量合计，单行DataFrame，可直接用于 calculate_monthly_mom_rates()"""
+    track_state = state['tracks'].get(track_name)
+    monthly = track_state['monthly'] if track_state else np.zeros(len(MONTH_COLUMNS))
+    return pd.DataFrame([monthly], columns=MONTH_COLUMNS)
+
+
+@memoize_by_data_version
+def get_ingested_aggregation():
+    """分块聚合 TOOLIFY_INGEST_SOURCE 指定的数据源（按数据版本缓存）"""
+    return aggregate_source(get_ingest_source())
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="分块读取并增量聚合工具数据")
+    parser.add_argument("source", help="CSV/Parquet文件，或包含分赛道副本的目录")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="每批行数")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    start = time.perf_counter()
+    aggregation = aggregate_source(args.source, args.batch_size)
+    print(f"分块聚合 {aggregation['rows']:,} 行，耗时 {time.perf_counter() - start:.2f}s")
+    print(aggregation_to_track_table(aggregation).to_string())
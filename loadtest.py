@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+仪表板并发压测工具
+
+模拟N个并发会话随机点击侧边栏导航和"其他赛道"选择框，统计每次rerun的延迟分位数
+（p50/p95/p99）、吞吐量和内存增长。
+
+    python loadtest.py --sessions 20 --steps 30                      # 启动一个streamlit服务并通过websocket压测
+    python loadtest.py --sessions 20 --url http://localhost:8501     # 压测已运行的服务
+    python loadtest.py --sessions 8 --mode process                   # 每个会话独立进程运行AppTest
+
+server模式（默认）启动一个真实的 `streamlit run` worker，各会话像浏览器一样通过
+/_stcore/stream websocket发送rerun请求，等待脚本运行结束计时。所有会话共享这一个worker
+进程的缓存、GIL和会话管理，延迟分位数反映单个worker能承受的并发量；RSS增长按worker进程
+整体统计并平均到每个会话（压测已运行的服务时不统计）。
+
+process模式每个会话在独立进程中用AppTest运行 app.py，缓存互不共享，只适合按会话精确
+统计RSS增长，不代表单个worker的并发能力。单步失败只记入错误列表，不会中断压测。
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from aggregates import KEY_TRACKS
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# 与 app.py 中 create_sidebar_navigation() 的页面一致
+NAV_PAGES = ['总览'] + KEY_TRACKS + ['其他赛道', '数据变化']
+# 启动服务后等待健康检查通过的最长时间
+SERVER_START_TIMEOUT = 60
+
+
+def read_rss_mb(pid=None):
+    """读取进程的常驻内存（MB），默认当前进程；指定pid时仅支持Linux，读取失败返回None"""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        if pid is not None:
+            return None
+
+    # 非Linux平台退化为峰值RSS（macOS单位为字节，Linux为KB）
+    import resource
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+def run_session(session_id, steps, seed=0, timeout=60):
+    """运行一个模拟会话：首次加载后随机导航 steps 次
+
+    Returns:
+        dict: 会话编号、每次rerun的延迟、错误列表、会话前后RSS
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed + session_id)
+    rss_before = read_rss_mb()
+    latencies = []
+    errors = []
+
+    def timed_run(make_action, label):
+        """执行一步并计时；查找控件失败（如上一次rerun出错后控件不存在）也只记为该步错误"""
+        start = time.perf_counter()
+        try:
+            make_action().run()
+        except Exception as e:
+            errors.append(f"{label}: {type(e).__name__}: {e}")
+            return False
+        latencies.append(time.perf_counter() - start)
+        for exception in at.exception:
+            errors.append(f"{label}: {exception.message}")
+        return True
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    timed_run(lambda: at, "首次加载")
+
+    for _ in range(steps):
+        page = rng.choice(NAV_PAGES)
+        if not timed_run(lambda: at.button(key=f"nav_{page}").click(), page):
+            continue
+
+        # 其他赛道页再随机选择一个赛道
+        if page == '其他赛道':
+            select_boxes = [box for box in at.selectbox if box.key == "other_track_select"]
+            if select_boxes and select_boxes[0].options:
+                track = rng.choice(select_boxes[0].options)
+                timed_run(lambda: select_boxes[0].select(track), f"其他赛道/{track}")
+
+    return {
+        '会话': session_id,
+        '延迟': latencies,
+        '错误': errors,
+        'RSS前(MB)': rss_before,
+        'RSS后(MB)': read_rss_mb(),
+    }
+
+
+def summarize_latencies(latencies):
+    """计算延迟分位数（毫秒）"""
+    if not latencies:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+
+    values_ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(values_ms, [50, 95, 99])
+    return {'p50': p50, 'p95': p95, 'p99': p99, 'max': values_ms.max()}
+
+
+def find_free_port():
+    """本机空闲端口"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, timeout=SERVER_START_TIMEOUT):
+    """启动一个headless的streamlit服务，健康检查通过后返回进程"""
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP_PATH, "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"streamlit服务启动失败，退出码 {server.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return server
+        except OSError:
+            time.sleep(0.2)
+
+    server.terminate()
+    raise RuntimeError(f"streamlit服务在 {timeout}s 内未就绪")
+
+
+class ServerSession:
+    """通过websocket连接streamlit服务的模拟浏览器会话"""
+
+    def __init__(self, websocket, timeout):
+        self.websocket = websocket
+        self.timeout = timeout
+        # 最近一次rerun渲染的控件：key -> 控件proto
+        self.widgets = {}
+
+    async def rerun(self, widget_states=()):
+        """发送rerun请求并等待脚本运行结束（点击导航后应用会再rerun一次，以最后一次为准）
+
+        Returns:
+            list: 本次rerun中应用抛出的异常信息
+        """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        back_msg = BackMsg()
+        back_msg.rerun_script.query_string = ""
+        back_msg.rerun_script.widget_states.widgets.extend(widget_states)
+        await self.websocket.send(back_msg.SerializeToString())
+
+        widgets = {}
+        errors = []
+        while True:
+            forward_msg = ForwardMsg()
+            forward_msg.ParseFromString(await asyncio.wait_for(self.websocket.recv(), self.timeout))
+            msg_type = forward_msg.WhichOneof('type')
+
+            if msg_type == 'delta' and forward_msg.delta.WhichOneof('type') == 'new_element':
+                element = forward_msg.delta.new_element
+                element_type = element.WhichOneof('type')
+                if element_type == 'exception':
+                    errors.append(element.exception.message)
+                elif element_type in ('button', 'selectbox'):
+                    widget = getattr(element, element_type)
+                    # 指定key的控件id形如 "$$ID-<hash>-<key>"
+                    widgets[widget.id.split('-', 2)[-1]] = widget
+            elif msg_type == 'script_finished':
+                status = forward_msg.script_finished
+                if status == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    errors.append("脚本编译失败")
+                if status != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    self.widgets = widgets
+                    return errors
+
+    def click(self, key):
+        """点击按钮的控件状态"""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        return [WidgetState(id=self.widgets[key].id, trigger_value=True)]
+
+    def select(self, key, option):
+        """选择框选中某一项的控件状态（新版本按选项文本，旧版本按下标）"""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        selectbox = self.widgets[key]
+        if 'raw_value' in selectbox.DESCRIPTOR.fields_by_name:
+            return [WidgetState(id=selectbox.id, string_value=option)]
+        return [WidgetState(id=selectbox.id, int_value=list(selectbox.options).index(option))]
+
+
+async def run_server_session(ws_url, session_id, steps, seed=0, timeout=60):
+    """运行一个websocket会话：首次加载后随机导航 steps 次，返回会话编号、延迟和错误列表"""
+    import websockets
+
+    rng = random.Random(seed + session_id)
+    latencies = []
+    errors = []
+
+    async with websockets.connect(ws_url, subprotocols=["streamlit"], max_size=None) as websocket:
+        session = ServerSession(websocket, timeout)
+
+        async def timed_run(make_states, label):
+            """执行一步并计时；控件不存在或超时只记为该步错误"""
+            start = time.perf_counter()
+            try:
+                step_errors = await session.rerun(make_states())
+            except Exception as e:
+                errors.append(f"{label}: {type(e).__name__}: {e}")
+                return False
+            latencies.append(time.perf_counter() - start)
+            errors.extend(f"{label}: {message}" for message in step_errors)
+            return True
+
+        await timed_run(lambda: (), "首次加载")
+
+        for _ in range(steps):
+            page = rng.choice(NAV_PAGES)
+            if not await timed_run(lambda: session.click(f"nav_{page}"), page):
+                continue
+
+            # 其他赛道页再随机选择一个赛道
+            selectbox = session.widgets.get("other_track_select") if page == '其他赛道' else None
+            if selectbox is not None and selectbox.options:
+                track = rng.choice(list(selectbox.options))
+                await timed_run(lambda: session.select("other_track_select", track), f"其他赛道/{track}")
+
+    return {'会话': session_id, '延迟': latencies, '错误': errors}
+
+
+async def _run_server_sessions(ws_url, sessions, steps, seed, timeout):
+    """并发运行全部websocket会话，单个会话失败（如连接断开）时仍返回其结果"""
+    results = await asyncio.gather(
+        *(run_server_session(ws_url, session_id, steps, seed, timeout) for session_id in range(sessions)),
+        return_exceptions=True)
+    return [
+        result if not isinstance(result, BaseException)
+        else {'会话': session_id, '延迟': [], '错误': [f"会话失败: {result}"]}
+        for session_id, result in enumerate(results)
+    ]
+
+
+def run_process_sessions(sessions, steps, seed, timeout):
+    """每个会话在独立进程中运行AppTest"""
+    with ProcessPoolExecutor(max_workers=sessions) as pool:
+        futures = [pool.submit(run_session, session_id, steps, seed, timeout) for session_id in range(sessions)]
+        results = []
+        for session_id, future in enumerate(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                # 会话整体失败（如进程崩溃）时仍输出报告
+                results.append({'会话': session_id, '延迟': [], '错误': [f"会话失败: {e}"],
+                                'RSS前(MB)': 0.0, 'RSS后(MB)': 0.0})
+    return results
+
+
+def run_load_test(sessions=10, steps=20, mode="server", seed=0, timeout=60, url=None):
+    """并发运行多个模拟会话并汇总结果
+
+    Args:
+        mode: "server"（默认，压测单个streamlit worker）或 "process"（每个会话独立的AppTest进程）
+        url: server模式下压测已运行的服务（如 http://localhost:8501），默认启动一个新服务
+    """
+    server = None
+    if mode == "server" and url is None:
+        port = find_free_port()
+        server = start_server(port)
+        url = f"http://127.0.0.1:{port}"
+    def read_target_rss():
+        """server模式统计worker进程，压测外部服务时不统计；process模式统计当前进程"""
+        if mode == "server":
+            return read_rss_mb(server.pid) if server else None
+        return read_rss_mb()
+
+    try:
+        rss_start = read_target_rss()
+        start = time.perf_counter()
+        if mode == "server":
+            ws_url = url.rstrip('/').replace('http', 'ws', 1) + "/_stcore/stream"
+            results = asyncio.run(_run_server_sessions(ws_url, sessions, steps, seed, timeout))
+        else:
+            results = run_process_sessions(sessions, steps, seed, timeout)
+        wall_seconds = time.perf_counter() - start
+        rss_end = read_target_rss()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    all_latencies = [latency for result in results for latency in result['延迟']]
+
+    if mode == "process":
+        # 每个会话独立进程，RSS增长可按会话精确统计
+        per_session_rss = [result['RSS后(MB)'] - result['RSS前(MB)'] for result in results]
+    elif rss_start is not None and rss_end is not None:
+        # 会话共享worker进程，只能统计进程整体增长并平均到每个会话
+        per_session_rss = [(rss_end - rss_start) / sessions] * sessions
+    else:
+        per_session_rss = None
+
+    return {
+        '模式': mode,
+        '会话数': sessions,
+        '每会话步数': steps,
+        '总耗时(秒)': wall_seconds,
+        'rerun次数': len(all_latencies),
+        '吞吐量(次/秒)': len(all_latencies) / wall_seconds if wall_seconds > 0 else 0.0,
+        '延迟(ms)': summarize_latencies(all_latencies),
+        '每会话RSS增长(MB)': per_session_rss,
+        '进程RSS(MB)': (rss_start, rss_end) if per_session_rss is not None else None,
+        '错误': [error for result in results for error in result['错误']],
+    }
+
+
+def print_report(report):
+    """打印压测报告"""
+    latency = report['延迟(ms)']
+    rss_growth = report['每会话RSS增长(MB)']
+
+    print(f"\n📊 压测报告（{report['模式']}模式，{report['会话数']} 个会话 × {report['每会话步数']} 步）")
+    print(f"  总耗时: {report['总耗时(秒)']:.2f}s，rerun次数: {report['rerun次数']}")
+    print(f"  吞吐量: {report['吞吐量(次/秒)']:.2f} 次rerun/秒")
+    print(f"  rerun延迟: p50 {latency['p50']:.1f}ms | p95 {latency['p95']:.1f}ms | "
+          f"p99 {latency['p99']:.1f}ms | max {latency['max']:.1f}ms")
+    if rss_growth is None:
+        print("  RSS: 压测外部服务时不统计")
+    else:
+        print(f"  每会话RSS增长: 平均 {np.mean(rss_growth):.1f}MB，最大 {np.max(rss_growth):.1f}MB")
+        print(f"  进程RSS: {report['进程RSS(MB)'][0]:.1f}MB → {report['进程RSS(MB)'][1]:.1f}MB")
+
+    if report['错误']:
+        print(f"  ❌ 错误 {len(report['错误'])} 个，前5个:")
+        for error in report['错误'][:5]:
+            print(f"    {error}")
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="仪表板并发压测")
+    parser.add_argument("--sessions", type=int, default=10, help="并发会话数")
+    parser.add_argument("--steps", type=int, default=20, help="每个会话的导航次数")
+    parser.add_argument("--mode", choices=["server", "process"], default="server",
+                        help="server: 所有会话通过websocket访问同一个streamlit worker（默认）；"
+                             "process: 每个会话独立进程运行AppTest，缓存不共享")
+    parser.add_argument("--url", default=None, help="server模式下压测已运行的服务，默认启动一个新服务")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--timeout", type=float, default=60, help="单次rerun超时秒数")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print_report(run_load_test(args.sessions, args.steps, args.mode, args.seed, args.timeout, args.url))
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+会话内存诊断（可选开启）
+
+设置环境变量 TOOLIFY_MEMORY_DIAGNOSTICS=1 后，每次rerun前后用tracemalloc记录
+已追踪内存，并统计DataFrame/Figure等对象数量，按会话和页面累计净增长。
+连续多次rerun都在增长的会话会被标记为疑似泄漏。
+
+完整快照与堆上已追踪块数成正比（加载Plotly后可达数十万块、耗时数秒），
+因此不在每次rerun采集，而是按需调用 capture_snapshot()，与上一次快照对比给出主要分配位置。
+
+tracemalloc统计的是整个进程：与其他会话的rerun或后台预热/预取（background_activity）重叠的rerun
+会被标记为"并发"，其净增长不计入页面累计，也不参与疑似泄漏判断。
+会话记录按最近活动时间保留，超过 SESSION_TTL_SECONDS 未活动或超过 MAX_SESSIONS 个的会话被清理。
+
+tracemalloc和gc统计本身有明显开销，只用于排查问题和容量评估，不应在生产中常开。
+"""
+
+import contextlib
+import gc
+import os
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+
+MEMORY_DIAGNOSTICS_ENV = "TOOLIFY_MEMORY_DIAGNOSTICS"
+
+# tracemalloc保存的调用栈深度（按行统计只需要1层，层数越多开销越大）
+TRACE_FRAMES = 1
+# 判断持续增长的窗口（最近N次rerun）和窗口内累计增长阈值
+GROWTH_WINDOW = 5
+GROWTH_THRESHOLD_BYTES = 256 * 1024
+# 每个会话保留的rerun记录数
+MAX_HISTORY = 50
+# 最多保留的会话数，以及会话记录在最后一次rerun后的保留时间
+MAX_SESSIONS = 200
+SESSION_TTL_SECONDS = 3600
+# 关注的对象类型
+TRACKED_TYPES = ("DataFrame", "Series", "Figure")
+
+_lock = threading.Lock()
+# 会话 -> rerun记录，按最近活动时间排序
+_session_histories = OrderedDict()
+_session_last_seen = {}
+# 进行中的rerun（起点记录）和后台任务数，用于标记并发
+_active_reruns = {}
+_background_tasks = 0
+_page_stats = {}
+_last_snapshot = None
+_last_top_stats = []
+
+
+def is_enabled():
+    """是否开启内存诊断"""
+    return os.environ.get(MEMORY_DIAGNOSTICS_ENV, "").lower() in ("1", "true", "yes")
+
+
+def count_objects():
+    """统计存活对象总数及关注类型的数量"""
+    counts = Counter(type(obj).__name__ for obj in gc.get_objects())
+    result = {name: counts.get(name, 0) for name in TRACKED_TYPES}
+    result['对象总数'] = sum(counts.values())
+    return result
+
+
+def _mark_active_reruns_concurrent():
+    """把进行中的rerun标记为并发（调用方持有 _lock）"""
+    for active in _active_reruns.values():
+        active['并发'] = True
+
+
+@contextlib.contextmanager
+def background_activity():
+    """包裹后台预热/预取等工作：期间进行中的rerun都标记为并发，其内存变化不计入会话"""
+    global _background_tasks
+    with _lock:
+        _background_tasks += 1
+        _mark_active_reruns_concurrent()
+    try:
+        yield
+    finally:
+        with _lock:
+            _background_tasks -= 1
+
+
+def begin_rerun():
+    """rerun开始时调用，返回用于 end_rerun 的起点记录"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACE_FRAMES)
+
+    gc.collect()
+    start_record = {'开始时间': time.perf_counter(), '起始内存': tracemalloc.get_traced_memory()[0], '并发': False}
+    with _lock:
+        if _active_reruns or _background_tasks:
+            start_record['并发'] = True
+            _mark_active_reruns_concurrent()
+        _active_reruns[id(start_record)] = start_record
+    return start_record
+
+
+def _prune_sessions(now):
+    """清理长时间未活动的会话，并限制会话总数（调用方持有 _lock）"""
+    while _session_histories:
+        oldest = next(iter(_session_histories))
+        if len(_session_histories) <= MAX_SESSIONS and now - _session_last_seen[oldest] <= SESSION_TTL_SECONDS:
+            break
+        _session_histories.pop(oldest)
+        _session_last_seen.pop(oldest, None)
+
+
+def end_rerun(session_id, page, start_record):
+    """rerun结束时调用：记录本次rerun的净增长和对象数量；与其他活动并发的rerun不计入页面累计"""
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+
+    with _lock:
+        _active_reruns.pop(id(start_record), None)
+        concurrent = start_record['并发']
+
+    record = {
+        '页面': page,
+        '耗时(秒)': round(time.perf_counter() - start_record['开始时间'], 3),
+        '净增长(KB)': round((current - start_record['起始内存']) / 1024, 1),
+        '并发': concurrent,
+        '追踪内存(MB)': round(current / (1024 * 1024), 2),
+        '峰值(MB)': round(peak / (1024 * 1024), 2),
+    }
+    record.update(count_objects())
+
+    now = time.monotonic()
+    with _lock:
+        history = _session_histories.setdefault(session_id, [])
+        history.append(record)
+        del history[:-MAX_HISTORY]
+        _session_histories.move_to_end(session_id)
+        _session_last_seen[session_id] = now
+        _prune_sessions(now)
+
+        stats = _page_stats.setdefault(page, {'页面': page, 'rerun次数': 0, '并发rerun(未计入)': 0,
+                                              '累计净增长(KB)': 0.0})
+        stats['rerun次数'] += 1
+        if concurrent:
+            stats['并发rerun(未计入)'] += 1
+        else:
+            stats['累计净增长(KB)'] = round(stats['累计净增长(KB)'] + record['净增长(KB)'], 1)
+
+    tracemalloc.reset_peak()
+    return record
+
+
+def capture_snapshot(top_n=10):
+    """采集一次快照，与上一次快照对比返回增长最多的分配位置；首次调用只建立基线"""
+    global _last_snapshot, _last_top_stats
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACE_FRAMES)
+
+    gc.collect()
+    snapshot = tracemalloc.take_snapshot()
+
+    with _lock:
+        previous = _last_snapshot
+        _last_snapshot = snapshot
+
+    if previous is None:
+        return []
+
+    # 先比较再过滤诊断工具自身的分配，避免对全部追踪块做过滤
+    ignored_files = (tracemalloc.__file__, __file__)
+    top_stats = []
+    for stat in snapshot.compare_to(previous, 'lineno'):
+        frame = stat.traceback[0]
+        if frame.filename in ignored_files:
+            continue
+        top_stats.append({
+            '位置': f"{frame.filename}:{frame.lineno}",
+            '增长(KB)': round(stat.size_diff / 1024, 1),
+            '块数增长': stat.count_diff,
+            '当前(KB)': round(stat.size / 1024, 1),
+        })
+        if len(top_stats) >= top_n:
+            break
+
+    with _lock:
+        _last_top_stats = top_stats
+    return list(top_stats)
+
+
+def get_session_history(session_id):
+    """返回会话的rerun记录"""
+    with _lock:
+        return list(_session_histories.get(session_id, []))
+
+
+def get_page_stats():
+    """返回各页面的累计统计"""
+    with _lock:
+        return [dict(stats) for stats in _page_stats.values()]
+
+
+def get_top_allocations():
+    """返回最近一次快照相对上一次快照的主要分配位置"""
+    with _lock:
+        return list(_last_top_stats)
+
+
+def find_growing_sessions(window=GROWTH_WINDOW, threshold_bytes=GROWTH_THRESHOLD_BYTES):
+    """找出最近 window 次非并发rerun都在净增长、且累计增长超过阈值的会话"""
+    growing = []
+    with _lock:
+        for session_id, history in _session_histories.items():
+            recent = [record for record in history if not record['并发']][-window:]
+            if len(recent) < window:
+                continue
+            growth_kb = [record['净增长(KB)'] for record in recent]
+            if all(value > 0 for value in growth_kb) and sum(growth_kb) * 1024 > threshold_bytes:
+                growing.append({
+                    '会话': session_id,
+                    f'最近{window}次累计增长(KB)': round(sum(growth_kb), 1),
+                    '当前追踪内存(MB)': recent[-1]['追踪内存(MB)'],
+                })
+    return growing
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多进程分片聚合
+
+把总表的月度访问量矩阵和赛道编码放入共享内存，按行区间切成若干分片交给进程池，
+worker直接映射共享内存而不需要序列化数据，每个分片用 ingest.update_aggregation
+得到可合并的聚合状态，主进程按分片顺序合并后转换为页面使用的聚合表、核心指标、
+MoM矩阵和TOP K。聚合耗时随核数近似线性下降。
+
+设置环境变量 TOOLIFY_AGGREGATION_WORKERS 大于1后，aggregates 中按数据版本缓存的
+赛道概览、核心指标、MoM矩阵和赛道TOP N都改由本模块计算。
+
+    python parallel_aggregation.py --workers 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from data_loader import MONTH_COLUMNS, load_summary_data, memoize_by_data_version
+from ingest import DEFAULT_BATCH_SIZE, merge_aggregations, new_aggregation, update_aggregation
+
+AGGREGATION_WORKERS_ENV = "TOOLIFY_AGGREGATION_WORKERS"
+# Streamlit服务是多线程进程（会话线程、预热和预取线程），fork可能复制持有中的锁，
+# worker一律用spawn启动全新的解释器
+MP_START_METHOD = "spawn"
+# 分片保留的TOP K容量，覆盖聚合接口允许的最大n（api_server.MAX_TOP_N），TOP N不必回退到整表
+PARALLEL_TOP_K = 100
+
+
+def get_aggregation_workers():
+    """聚合进程数，未配置时为1（不启用多进程）"""
+    try:
+        return max(1, int(os.environ.get(AGGREGATION_WORKERS_ENV, "1")))
+    except ValueError:
+        return 1
+
+
+def is_parallel_enabled():
+    """是否启用多进程分片聚合；单核或核数少于进程数时多进程只有额外开销，使用单进程计算"""
+    workers = get_aggregation_workers()
+    return workers > 1 and (os.cpu_count() or 1) >= workers
+
+
+def shard_ranges(n_rows, n_shards):
+    """把 [0, n_rows) 切成 n_shards 个连续行区间"""
+    bounds = np.linspace(0, n_rows, max(1, n_shards) + 1).astype(int)
+    return [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def _to_shared(array):
+    """复制数组到新建的共享内存，返回 (共享内存, 描述信息)"""
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def _aggregate_shard(months_spec, codes_spec, track_names, start, end, batch_size, top_k):
+    """worker：映射共享内存，聚合 [start, end) 行
+
+    TOP K记录中的工具名称先用全局行号代替，由主进程换回名称，避免向worker传递字符串列。
+    """
+    months_shm = shared_memory.SharedMemory(name=months_spec[0])
+    codes_shm = shared_memory.SharedMemory(name=codes_spec[0])
+    months = np.ndarray(months_spec[1], dtype=months_spec[2], buffer=months_shm.buf)
+    codes = np.ndarray(codes_spec[1], dtype=codes_spec[2], buffer=codes_shm.buf)
+    try:
+        track_names = np.asarray(track_names, dtype=object)
+
+        state = new_aggregation(top_k)
+        for batch_start in range(start, end, batch_size):
+            batch_end = min(batch_start + batch_size, end)
+            batch = pd.DataFrame(months[batch_start:batch_end], columns=MONTH_COLUMNS)
+            batch.insert(0, '赛道分类', track_names[codes[batch_start:batch_end]])
+            batch.insert(0, 'Tools名称', np.arange(batch_start, batch_end))
+            update_aggregation(state, batch)
+        return state
+    finally:
+        # 先释放对共享内存缓冲区的引用才能关闭
+        del months, codes
+        months_shm.close()
+        codes_shm.close()
+
+
+def _restore_tool_names(state, tool_names):
+    """把TOP K记录中的行号换回工具名称"""
+    for heaps in state['top']['heaps'].values():
+        for heap in heaps.values():
+            heap[:] = [(value, neg_row_id, (tool_names[record[0]],) + tuple(record[1:]))
+                       for value, neg_row_id, record in heap]
+    return state
+
+
+def aggregate_dataframe_parallel(df, workers=None, shards=None, batch_size=DEFAULT_BATCH_SIZE, top_k=PARALLEL_TOP_K):
+    """多进程分片聚合DataFrame，返回与 ingest.aggregate_source() 相同结构的聚合状态
+
+    Args:
+        df: 含 Tools名称、赛道分类 和各月访问量列的总表
+        workers: 进程数，默认读取环境变量 TOOLIFY_AGGREGATION_WORKERS
+        shards: 分片数，默认与进程数相同
+        top_k: 每个赛道保留的TOP K容量
+
+    worker返回各分片的赛道合计、增速草图和TOP K堆，主进程只合并这些状态，不再扫描总表。
+    """
+    workers = workers or get_aggregation_workers()
+    shards = shards or workers
+
+    ranges = shard_ranges(len(df), shards)
+    if workers <= 1 or len(ranges) <= 1:
+        return update_aggregation(new_aggregation(top_k), df[['Tools名称', '赛道分类'] + MONTH_COLUMNS])
+
+    months = df[MONTH_COLUMNS].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    codes, track_names = pd.factorize(df['赛道分类'].astype(str))
+    codes = codes.astype(np.int32)
+    tool_names = df['Tools名称'].tolist()
+
+    months_shm, months_spec = _to_shared(months)
+    codes_shm, codes_spec = _to_shared(codes)
+    try:
+        mp_context = multiprocessing.get_context(MP_START_METHOD)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as pool:
+            futures = [
+                pool.submit(_aggregate_shard, months_spec, codes_spec, list(track_names), start, end, batch_size,
+                            top_k)
+                for start, end in ranges
+            ]
+            # 按分片顺序合并，TOP K同值时的先后与整表计算一致
+            states = [future.result() for future in futures]
+    finally:
+        months_shm.close()
+        months_shm.unlink()
+        codes_shm.close()
+        codes_shm.unlink()
+
+    return _restore_tool_names(merge_aggregations(*states), tool_names)
+
+
+@memoize_by_data_version
+def get_parallel_aggregation():
+    """总表的多进程分片聚合结果（按数据版本缓存）"""
+    return aggregate_dataframe_parallel(load_summary_data())
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="多进程分片聚合总表")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="进程数")
+    parser.add_argument("--shards", type=int, default=None, help="分片数，默认与进程数相同")
+    parser.add_argument("--repeat", type=int, default=1, help="把总表重复N次模拟大数据量")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from ingest import aggregation_to_track_table
+
+    args = parse_args()
+    df = load_summary_data()
+    if args.repeat > 1:
+        df = pd.concat([df] * args.repeat, ignore_index=True)
+
+    start = time.perf_counter()
+    aggregate_dataframe_parallel(df, workers=1)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    aggregation = aggregate_dataframe_parallel(df, workers=args.workers, shards=args.shards)
+    parallel = time.perf_counter() - start
+
+    print(f"{len(df):,} 行：单进程 {single:.2f}s，{args.workers} 进程 {parallel:.2f}s")
+    print(aggregation_to_track_table(aggregation).to_string())
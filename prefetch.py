@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导航预取
+
+记录侧边栏的页面访问和页面间跳转次数。当前页面渲染完成后，把其余页面按
+"从当前页跳转过去的次数 > 总访问次数 > 导航顺序" 排序，交给后台线程依次调用这些页面
+用到的按数据版本缓存的函数（聚合表、TOP 10、图表等），用户点击时直接命中进程内共享缓存。
+
+预取只向队列提交任务，不阻塞当前会话的rerun；同一数据版本下每个页面只预取一次。
+若用户点击的页面正在预取，按key加锁的缓存会让会话等待这次计算完成，而不是重复计算。
+导航统计由后台线程写入缓存目录下的 nav_stats.json，服务重启后继续沿用。
+
+    TOOLIFY_PREFETCH=0     关闭预取
+    python prefetch.py     查看导航统计和各页面的预取顺序
+"""
+
+import contextlib
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+
+import disk_cache
+import memory_diagnostics
+from data_loader import get_data_version, get_ingest_source
+
+PREFETCH_ENV = "TOOLIFY_PREFETCH"
+NAV_STATS_FILENAME = "nav_stats.json"
+# 会话首次进入的页面记为从该页跳转
+ENTRY_PAGE = "(进入)"
+
+_stats = None
+_stats_dirty = False
+_stats_lock = threading.Lock()
+
+_queue = queue.Queue()
+_scheduled = set()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def is_enabled():
+    """是否启用预取（默认启用）"""
+    return os.environ.get(PREFETCH_ENV, "1").lower() not in ("0", "false", "no")
+
+
+def get_nav_stats_path():
+    """导航统计文件路径（与磁盘缓存同目录）"""
+    return os.path.join(disk_cache.get_cache_dir(), NAV_STATS_FILENAME)
+
+
+def _load_stats():
+    """首次使用时读取导航统计文件（调用方持有 _stats_lock）"""
+    global _stats
+    if _stats is None:
+        _stats = {'visits': {}, 'transitions': {}}
+        try:
+            with open(get_nav_stats_path(), encoding='utf-8') as f:
+                saved = json.load(f)
+            _stats['visits'].update(saved.get('visits', {}))
+            _stats['transitions'].update(saved.get('transitions', {}))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"读取导航统计失败: {e}")
+    return _stats
+
+
+def get_nav_stats():
+    """导航统计的副本：visits（页面 -> 访问次数）、transitions（来源页 -> {目标页: 次数}）"""
+    with _stats_lock:
+        stats = _load_stats()
+        return {
+            'visits': dict(stats['visits']),
+            'transitions': {page: dict(targets) for page, targets in stats['transitions'].items()},
+        }
+
+
+def record_navigation(from_page, to_page):
+    """记录一次页面跳转；from_page为None表示会话首次进入"""
+    global _stats_dirty
+    with _stats_lock:
+        stats = _load_stats()
+        stats['visits'][to_page] = stats['visits'].get(to_page, 0) + 1
+        targets = stats['transitions'].setdefault(from_page or ENTRY_PAGE, {})
+        targets[to_page] = targets.get(to_page, 0) + 1
+        _stats_dirty = True
+
+
+def save_nav_stats():
+    """有新记录时原子写入导航统计文件（多进程时以最后写入的为准）"""
+    global _stats_dirty
+    with _stats_lock:
+        if not _stats_dirty:
+            return
+        payload = json.dumps(_load_stats(), ensure_ascii=False, indent=2)
+        _stats_dirty = False
+
+    path = get_nav_stats_path()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        print(f"保存导航统计失败: {e}")
+
+
+def rank_pages(current_page, pages, stats=None):
+    """除当前页外的页面，按从当前页跳转的次数、总访问次数、导航顺序排序"""
+    stats = stats or get_nav_stats()
+    transitions = stats['transitions'].get(current_page, {})
+    visits = stats['visits']
+    order = {page: idx for idx, page in enumerate(pages)}
+    return sorted((page for page in pages if page != current_page),
+                  key=lambda page: (-transitions.get(page, 0), -visits.get(page, 0), order[page]))
+
+
+def page_tasks(page):
+    """页面用到的按数据版本缓存的函数，返回 [(名称, 函数, 参数)]；不需要预取的页面返回空列表"""
+    import aggregates
+    import charts
+
+    if get_ingest_source():
+        from ingest import get_ingested_aggregation
+
+        if page == "总览":
+            return [('总览图表', charts.get_ingested_overview_figures, ())]
+        if page == "其他赛道":
+            other_tracks = [track for track in get_ingested_aggregation()['tracks']
+                            if track not in aggregates.KEY_TRACKS and track != "其他"]
+            page = other_tracks[0] if other_tracks else None
+        if page in get_ingested_aggregation()['tracks']:
+            return [(f'{page} 图表', charts.get_ingested_track_figures, (page,))]
+        return []
+
+    import rank_index
+    import similarity
+
+    if page == "总览":
+        return [
+            ('核心指标', aggregates.get_overall_metrics, ()),
+            ('赛道概览', aggregates.get_track_overview, ()),
+            ('MoM热力图', charts.get_mom_heatmap, ()),
+            ('增长率分布图', charts.get_growth_distribution_chart, ()),
+        ]
+    if page == "其他赛道":
+        # 选择框默认选中第一个其他赛道
+        from data_loader import load_summary_data
+        other_tracks = aggregates.get_other_tracks(load_summary_data())
+        page = other_tracks[0] if other_tracks else None
+    elif page not in aggregates.KEY_TRACKS:
+        return []
+
+    if page is None:
+        return []
+    return [
+        (f'{page} 指标', aggregates.get_track_metrics, (page,)),
+        (f'{page} TOP 10', aggregates.get_top_tools_table, (page, 10)),
+        ('排名索引', rank_index.get_rank_index, ()),
+        ('相似度索引', similarity.get_similarity_index, ()),
+        (f'{page} 图表', charts.get_track_figures, (page,)),
+    ]
+
+
+def _run_worker():
+    """后台线程：依次预取队列中的页面并保存导航统计，数据版本已变化的任务直接丢弃"""
+    while True:
+        version, page = _queue.get()
+        if page is None:
+            save_nav_stats()
+            _queue.task_done()
+            continue
+
+        try:
+            if version == get_data_version():
+                start = time.perf_counter()
+                # 预取期间的内存变化不计入会话的内存诊断
+                with memory_diagnostics.background_activity():
+                    for name, func, args in page_tasks(page):
+                        func(*args)
+                        # 每个任务之间让出GIL，减少对前台rerun的影响
+                        time.sleep(0)
+                print(f"预取 {page} 完成，耗时 {time.perf_counter() - start:.3f}s")
+        except Exception as e:
+            print(f"预取 {page} 失败: {e}")
+        finally:
+            _queue.task_done()
+
+
+def schedule_prefetch(current_page, pages):
+    """当前页渲染完成后调用：把其余页面按预测顺序加入后台预取队列，立即返回"""
+    global _worker
+    if not is_enabled():
+        return
+
+    version = get_data_version()
+    with _worker_lock:
+        # 数据版本变化后重新预取全部页面
+        for key in [key for key in _scheduled if key[0] != version]:
+            _scheduled.discard(key)
+        _scheduled.add((version, current_page))
+
+        for page in rank_pages(current_page, pages):
+            if (version, page) not in _scheduled:
+                _scheduled.add((version, page))
+                _queue.put((version, page))
+        # 页面为None表示保存导航统计，排在预取任务之后
+        _queue.put((version, None))
+
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run_worker, name="page-prefetch", daemon=True)
+            _worker.start()
+
+
+if __name__ == "__main__":
+    from aggregates import KEY_TRACKS
+
+    nav_pages = ['总览'] + KEY_TRACKS + ['其他赛道', '数据变化']
+    stats = get_nav_stats()
+    print(f"导航统计文件: {os.path.abspath(get_nav_stats_path())}")
+    for page in nav_pages:
+        print(f"  {page}: 访问 {stats['visits'].get(page, 0)} 次，预取顺序 {' > '.join(rank_pages(page, nav_pages, stats))}")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+工具排名与百分位索引
+
+每个数据版本只构建一次：对各指标做一次全局排序和一次赛道内分组排序，
+结果存为按行对齐的数组，另建 Tools名称 -> 行号 的哈希表，
+单个工具的查询为O(1)，无需每次重新排序整个目录。工具名称另按小写排序，
+前缀搜索用二分查找定位，页面只需展示少量候选，不必把整个赛道的工具列表发送到浏览器。
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_loader import load_summary_data, memoize_by_data_version
+from formatting import format_number, parse_growth_rates
+
+# 参与排名的指标：列名 -> 显示名称
+RANK_METRICS = {
+    '2025年6月访问量': '6月访问量',
+    '半年访问增量': '半年增量',
+    '2025H1访问量增速': 'H1增速',
+}
+
+# 工具搜索最多返回的候选数
+MAX_SUGGESTIONS = 20
+# 前缀搜索的上界：拼在前缀后大于任何以该前缀开头的名称
+PREFIX_UPPER_BOUND = '\U0010ffff'
+
+
+def _metric_values(df, column):
+    """取指标的数值数组，增速字符串转换为数值"""
+    if column == '2025H1访问量增速':
+        return parse_growth_rates(df[column]).fillna(0).to_numpy(dtype=np.float64)
+    return pd.to_numeric(df[column], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+
+
+def build_rank_index(df):
+    """构建排名索引
+
+    排名按数值降序（并列取最小名次），百分位为不高于该值的工具占比。
+
+    Returns:
+        dict: positions（名称->行号）、names、tracks、track_sizes、
+              track_members（赛道->按6月访问量降序的工具名列表）、
+              name_order / sorted_names（按小写名称排序的行号和名称，用于前缀搜索）以及各指标的
+              values / global_rank / global_pct / track_rank / track_pct 数组
+    """
+    names = df['Tools名称'].astype(str).to_numpy()
+    tracks = df['赛道分类'].astype(str).to_numpy()
+    track_keys = pd.Series(tracks)
+
+    index = {
+        'positions': {name: pos for pos, name in enumerate(names)},
+        'names': names,
+        'tracks': tracks,
+        'total': len(df),
+        'track_sizes': track_keys.value_counts().to_dict(),
+        'metrics': {},
+    }
+
+    for column in RANK_METRICS:
+        values = pd.Series(_metric_values(df, column))
+        grouped = values.groupby(track_keys)
+        index['metrics'][column] = {
+            'values': values.to_numpy(),
+            'global_rank': values.rank(ascending=False, method='min').to_numpy(dtype=np.int64),
+            'global_pct': (values.rank(method='max', pct=True) * 100).to_numpy(),
+            'track_rank': grouped.rank(ascending=False, method='min').to_numpy(dtype=np.int64),
+            'track_pct': (grouped.rank(method='max', pct=True) * 100).to_numpy(),
+        }
+
+    # 按 (赛道, 6月访问量降序) 排序后切分，得到各赛道的工具列表
+    track_codes, track_labels = pd.factorize(track_keys)
+    order = np.lexsort((-index['metrics']['2025年6月访问量']['values'], track_codes))
+    boundaries = np.flatnonzero(np.diff(track_codes[order])) + 1
+    index['track_members'] = {
+        track_labels[track_codes[chunk[0]]]: names[chunk].tolist()
+        for chunk in np.split(order, boundaries) if len(chunk)
+    }
+
+    folded = pd.Series(names).str.casefold().to_numpy(dtype=object)
+    name_order = np.argsort(folded, kind='stable')
+    index['name_order'] = name_order
+    index['sorted_names'] = folded[name_order]
+
+    return index
+
+
+def search_tools(index, query, track_name, limit=MAX_SUGGESTIONS):
+    """赛道内按名称前缀（不区分大小写）搜索工具，按6月访问量降序最多返回limit个名称
+
+    名称完全一致的工具排在最前；query为空时返回赛道内访问量最高的limit个工具。
+    """
+    query = (query or '').strip()
+    if not query:
+        return index['track_members'].get(track_name, [])[:limit]
+
+    prefix = query.casefold()
+    start = np.searchsorted(index['sorted_names'], prefix, side='left')
+    end = np.searchsorted(index['sorted_names'], prefix + PREFIX_UPPER_BOUND, side='left')
+    rows = index['name_order'][start:end]
+    rows = rows[index['tracks'][rows] == track_name]
+    visits = index['metrics']['2025年6月访问量']['values'][rows]
+    matches = index['names'][rows[np.argsort(-visits, kind='stable')]].tolist()
+
+    exact = index['positions'].get(query)
+    if exact is not None and index['tracks'][exact] == track_name:
+        matches.remove(query)
+        matches.insert(0, query)
+    return matches[:limit]
+
+
+def lookup_tool_ranks(index, tool_name):
+    """查询单个工具在全局和所属赛道内的排名与百分位，工具不存在时返回None"""
+    pos = index['positions'].get(tool_name)
+    if pos is None:
+        return None
+
+    track_name = index['tracks'][pos]
+    result = {
+        'Tools名称': tool_name,
+        '赛道分类': track_name,
+        '全局工具数': index['total'],
+        '赛道工具数': index['track_sizes'].get(track_name, 0),
+        '指标': {},
+    }
+    for column, arrays in index['metrics'].items():
+        result['指标'][column] = {
+            'value': float(arrays['values'][pos]),
+            'global_rank': int(arrays['global_rank'][pos]),
+            'global_pct': float(arrays['global_pct'][pos]),
+            'track_rank': int(arrays['track_rank'][pos]),
+            'track_pct': float(arrays['track_pct'][pos]),
+        }
+    return result
+
+
+def create_tool_rank_table(ranks):
+    """将查询结果整理为展示表"""
+    rows = []
+    for column, label in RANK_METRICS.items():
+        metric = ranks['指标'][column]
+        is_growth = column == '2025H1访问量增速'
+        rows.append({
+            '指标': label,
+            '数值': format_number(metric['value'], is_percentage=is_growth),
+            '全局排名': f"{metric['global_rank']:,} / {ranks['全局工具数']:,}",
+            '全局百分位': f"P{metric['global_pct']:.1f}",
+            '赛道内排名': f"{metric['track_rank']:,} / {ranks['赛道工具数']:,}",
+            '赛道内百分位': f"P{metric['track_pct']:.1f}",
+        })
+    return pd.DataFrame(rows)
+
+
+@memoize_by_data_version
+def get_rank_index():
+    """排名索引（按数据版本缓存）"""
+    return build_rank_index(load_summary_data())
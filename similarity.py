@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相似增长曲线检索
+
+每个数据版本只构建一次：把每个工具的6个月访问量取 log1p 后去均值、归一化为单位向量，
+存成 float32 矩阵（每个工具24字节）。两个向量的点积即对数访问量曲线的相关系数，
+与工具体量无关，只比较曲线形状。查询时按批对候选行做矩阵乘法并用 argpartition
+取前K，不需要排序整个目录，百万级工具的查询也只需几十毫秒。
+
+    python similarity.py "ChatGPT" --k 10
+    python similarity.py --benchmark 1000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loader import MONTH_COLUMNS, load_summary_data, memoize_by_data_version
+from formatting import format_growth_rate, format_number
+
+# 默认返回的相似工具数
+DEFAULT_K = 10
+# 每批参与矩阵乘法的候选行数，限制中间结果的内存占用
+BATCH_ROWS = 262_144
+
+
+def normalize_trajectories(months):
+    """月度访问量矩阵 -> 单位化的对数曲线（float32），以及可比较的行（曲线不是常数）"""
+    logs = np.log1p(np.clip(np.asarray(months, dtype=np.float64), 0, None))
+    centered = logs - logs.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(centered, axis=1)
+    valid = norms > 1e-9
+    centered[valid] /= norms[valid, None]
+    centered[~valid] = 0
+    return centered.astype(np.float32), valid
+
+
+def build_similarity_index(df):
+    """构建相似度索引
+
+    Returns:
+        dict: matrix（n×6 float32单位向量）、valid（可比较的行）、names、tracks、
+              positions（名称->行号）、track_rows（赛道->可比较的行号）
+    """
+    months = df[MONTH_COLUMNS].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy()
+    matrix, valid = normalize_trajectories(months)
+    names = df['Tools名称'].astype(str).to_numpy()
+    tracks = df['赛道分类'].astype(str).to_numpy()
+
+    track_codes, track_labels = pd.factorize(tracks)
+    valid_rows = np.flatnonzero(valid)
+    return {
+        'matrix': matrix,
+        'valid': valid,
+        'names': names,
+        'tracks': tracks,
+        'positions': {name: pos for pos, name in enumerate(names)},
+        'track_rows': {label: valid_rows[track_codes[valid_rows] == code] for code, label in enumerate(track_labels)},
+        'valid_rows': valid_rows,
+    }
+
+
+def nearest_neighbours(matrix, queries, k=DEFAULT_K, candidates=None, exclude=None, batch_size=BATCH_ROWS):
+    """批量最近邻查询（点积越大越相似）
+
+    Args:
+        matrix: n×d float32 单位向量矩阵
+        queries: m×d 查询向量
+        candidates: 参与比较的行号（升序），默认全部行
+        exclude: 每个查询需要排除的行号（通常是查询工具自身），-1表示不排除
+
+    Returns:
+        (rows, scores): 两个 m×k' 数组，按相似度降序，同分时行号小的在前；k' 不超过候选数。
+        各查询排除的行不同，有效结果数可能不同，不足的位置行号为-1、相似度为-inf
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    n_queries = len(queries)
+    n_candidates = len(matrix) if candidates is None else len(candidates)
+    exclude = np.full(n_queries, -1) if exclude is None else np.asarray(exclude).reshape(-1)
+
+    best_rows = np.empty((n_queries, 0), dtype=np.int64)
+    best_scores = np.empty((n_queries, 0), dtype=np.float32)
+    for start in range(0, n_candidates, batch_size):
+        end = min(start + batch_size, n_candidates)
+        block_rows = np.arange(start, end) if candidates is None else np.asarray(candidates[start:end])
+        block = matrix[start:end] if candidates is None else matrix[block_rows]
+
+        scores = queries @ block.T
+        scores[block_rows[None, :] == exclude[:, None]] = -np.inf
+
+        rows = np.concatenate([best_rows, np.broadcast_to(block_rows, scores.shape)], axis=1)
+        scores = np.concatenate([best_scores, scores], axis=1)
+        if scores.shape[1] > k:
+            keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            rows = np.take_along_axis(rows, keep, axis=1)
+            scores = np.take_along_axis(scores, keep, axis=1)
+        best_rows, best_scores = rows, scores
+
+    order = np.lexsort((best_rows, -best_scores), axis=1) if best_rows.size else best_rows
+    best_rows = np.take_along_axis(best_rows, order, axis=1)
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+
+    # 被排除的行在候选数不足k时会留在结果中，按查询逐行标记，只去掉所有查询都无效的列
+    finite = np.isfinite(best_scores)
+    best_rows[~finite] = -1
+    keep = finite.any(axis=0)
+    return best_rows[:, keep], best_scores[:, keep]
+
+
+def find_similar_tools(index, tool_name, k=DEFAULT_K, track=None, candidates=None):
+    """查询与指定工具增长曲线最相似的k个工具
+
+    Args:
+        track: 只在该赛道内查找，默认查找全部赛道
+        candidates: 额外限定的候选行号（如筛选结果），与赛道条件取交集
+
+    Returns:
+        (rows, scores)；工具不存在或曲线无法比较（各月访问量相同）时返回None
+    """
+    pos = index['positions'].get(tool_name)
+    if pos is None or not index['valid'][pos]:
+        return None
+
+    rows = index['track_rows'].get(track, np.empty(0, dtype=np.int64)) if track else index['valid_rows']
+    if candidates is not None:
+        rows = np.intersect1d(rows, candidates, assume_unique=True)
+
+    rows, scores = nearest_neighbours(index['matrix'], index['matrix'][pos], k, candidates=rows, exclude=[pos])
+    found = rows[0] >= 0
+    return rows[0][found], scores[0][found]
+
+
+def create_similar_tools_table(df, rows, scores):
+    """相似工具展示表；rows为总表中的行号"""
+    similar = df.iloc[rows]
+    return pd.DataFrame({
+        '工具名称': similar['Tools名称'].to_numpy(),
+        '赛道': similar['赛道分类'].to_numpy(),
+        '相似度': np.round(scores.astype(np.float64), 3),
+        '6月访问量': [format_number(value) for value in similar['2025年6月访问量']],
+        'H1增速': [format_growth_rate(value) for value in similar['2025H1访问量增速']],
+    })
+
+
+@memoize_by_data_version
+def get_similarity_index():
+    """总表的相似度索引（按数据版本缓存）"""
+    return build_similarity_index(load_summary_data())
+
+
+def check_batched_queries(matrix, queries, k=DEFAULT_K, candidates=None, batch_size=BATCH_ROWS):
+    """批量查询的每一行应与单独查询的结果一致（含各查询有效结果数不同的情况），不一致时抛出AssertionError"""
+    batch_rows, batch_scores = nearest_neighbours(matrix, matrix[queries], k, candidates=candidates,
+                                                  exclude=queries, batch_size=batch_size)
+    for i, pos in enumerate(queries):
+        rows, scores = nearest_neighbours(matrix, matrix[pos], k, candidates=candidates, exclude=[pos],
+                                          batch_size=batch_size)
+        found = batch_rows[i] >= 0
+        assert np.array_equal(batch_rows[i][found], rows[0][rows[0] >= 0]), f"查询 {pos} 的批量结果与单独查询不一致"
+        assert np.allclose(batch_scores[i][found], scores[0][rows[0] >= 0])
+        assert np.all(np.isneginf(batch_scores[i][~found]))
+
+
+def run_benchmark(n_rows, k=DEFAULT_K, n_queries=20, seed=0):
+    """用随机曲线构造n_rows个工具的目录，测量构建和单次查询耗时"""
+    rng = np.random.default_rng(seed)
+    base = rng.lognormal(10, 2, size=(n_rows, 1))
+    months = base * np.cumprod(rng.lognormal(0, 0.3, size=(n_rows, len(MONTH_COLUMNS))), axis=1)
+
+    start = time.perf_counter()
+    matrix, valid = normalize_trajectories(months)
+    build = time.perf_counter() - start
+
+    queries = rng.choice(np.flatnonzero(valid), n_queries, replace=False)
+    start = time.perf_counter()
+    for pos in queries:
+        nearest_neighbours(matrix, matrix[pos], k, exclude=[pos])
+    single = (time.perf_counter() - start) / n_queries
+
+    start = time.perf_counter()
+    nearest_neighbours(matrix, matrix[queries], k, exclude=queries)
+    batched = time.perf_counter() - start
+
+    check_batched_queries(matrix, queries, k)
+    # 候选只有k个且部分查询工具在候选中：各查询的有效结果数不同
+    check_batched_queries(matrix, queries, k, candidates=np.sort(queries[:k]))
+
+    print(f"{n_rows:,} 个工具：矩阵 {matrix.nbytes / 1024 / 1024:.1f}MB，构建 {build * 1000:.0f}ms，"
+          f"单次查询 {single * 1000:.1f}ms，{n_queries} 个查询批量 {batched * 1000:.1f}ms（与逐个查询结果一致）")
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="查询增长曲线相似的工具")
+    parser.add_argument("tool", nargs="?", help="工具名称")
+    parser.add_argument("--k", type=int, default=DEFAULT_K, help="返回的相似工具数")
+    parser.add_argument("--track", default=None, help="只在该赛道内查找")
+    parser.add_argument("--benchmark", type=int, metavar="N", default=None, help="用N个随机工具测量查询耗时")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.benchmark:
+        run_benchmark(args.benchmark, args.k)
+    elif args.tool:
+        index = get_similarity_index()
+        result = find_similar_tools(index, args.tool, args.k, args.track)
+        if result is None:
+            print(f"未找到工具 {args.tool}，或其各月访问量相同无法比较")
+        else:
+            print(create_similar_tools_table(load_summary_data(), *result).to_string(index=False))
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+两期总表的变化对比
+
+以 Tools名称 为键，对两期总表的共有列逐行计算哈希，一次外连接即可找出新增、下架、
+内容变化的工具，并进一步给出赛道调整和访问量大幅波动。对比结果保存为JSON，
+仪表板"数据变化"页直接读取；受影响的赛道可以只重新生成对应的分赛道文件，
+新一期中已不存在的赛道会删除其分赛道文件。
+
+    python snapshot_diff.py 上期总表.xlsx toolify_processed_2025_summary.xlsx --rebuild-tracks data/2025H1
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loader import MONTH_COLUMNS, SUMMARY_FILE
+from generate_track_csv import _json_default, generate_track_excel_files, remove_track_files
+
+# 对比结果文件，仪表板"数据变化"页读取
+DIFF_FILE = "data/snapshot_diff.json"
+
+KEY_COLUMN = 'Tools名称'
+TRACK_COLUMN = '赛道分类'
+# 访问量波动：比较的月份列、相对变化阈值(%)和最小绝对变化，避免小工具的噪声
+SWING_COLUMN = MONTH_COLUMNS[-1]
+SWING_THRESHOLD = 50.0
+MIN_SWING_VISITS = 10_000
+
+
+def row_hashes(df, columns):
+    """按指定列计算每行的64位哈希；数值列统一转为float64，两期之间int/float类型变化不算内容变化"""
+    values = df[columns].copy()
+    for col in columns:
+        if pd.api.types.is_numeric_dtype(values[col]) and not pd.api.types.is_bool_dtype(values[col]):
+            values[col] = values[col].astype(np.float64)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+def diff_snapshots(old_df, new_df, swing_column=SWING_COLUMN, swing_threshold=SWING_THRESHOLD,
+                   min_swing_visits=MIN_SWING_VISITS):
+    """对比两期总表
+
+    Returns:
+        dict：
+            summary: 各类变化的数量
+            added / removed: 新增/下架工具（名称、赛道、访问量）
+            changed: 内容有变化的工具及变化的列
+            reassigned: 赛道调整（原赛道、新赛道）
+            swings: 访问量相对变化超过阈值的工具
+            affected_tracks: 需要重新生成的赛道（新旧赛道都计入）
+            removed_tracks: 新一期中已没有工具的赛道（其分赛道文件应删除）
+    """
+    columns = [col for col in new_df.columns if col in old_df.columns and col != KEY_COLUMN]
+
+    old = pd.DataFrame({KEY_COLUMN: old_df[KEY_COLUMN].to_numpy(), '_hash': row_hashes(old_df, columns)})
+    new = pd.DataFrame({KEY_COLUMN: new_df[KEY_COLUMN].to_numpy(), '_hash': row_hashes(new_df, columns)})
+    old['_row'] = np.arange(len(old))
+    new['_row'] = np.arange(len(new))
+
+    joined = old.merge(new, on=KEY_COLUMN, how='outer', suffixes=('_old', '_new'), indicator=True, sort=False)
+
+    added_rows = joined.loc[joined['_merge'] == 'right_only', '_row_new'].astype(int).to_numpy()
+    removed_rows = joined.loc[joined['_merge'] == 'left_only', '_row_old'].astype(int).to_numpy()
+    both = joined[(joined['_merge'] == 'both') & (joined['_hash_old'] != joined['_hash_new'])]
+    old_rows = both['_row_old'].astype(int).to_numpy()
+    new_rows = both['_row_new'].astype(int).to_numpy()
+
+    # 只对哈希不同的行逐列比较，找出变化的列
+    old_values = old_df[columns].iloc[old_rows].reset_index(drop=True)
+    new_values = new_df[columns].iloc[new_rows].reset_index(drop=True)
+    differs = ~((old_values == new_values) | (old_values.isna() & new_values.isna()))
+    # 哈希不同但逐列比较相等（如object列中的1与1.0）的行不算内容变化
+    has_change = differs.to_numpy().any(axis=1)
+    old_rows, new_rows = old_rows[has_change], new_rows[has_change]
+    old_values = old_values[has_change].reset_index(drop=True)
+    new_values = new_values[has_change].reset_index(drop=True)
+    differs = differs[has_change]
+    changed_columns = [', '.join(np.array(columns)[mask]) for mask in differs.to_numpy()]
+
+    changed = pd.DataFrame({
+        KEY_COLUMN: new_df[KEY_COLUMN].iloc[new_rows].to_numpy(),
+        TRACK_COLUMN: new_df[TRACK_COLUMN].iloc[new_rows].to_numpy(),
+        '变化列': changed_columns,
+    })
+
+    old_tracks = old_values[TRACK_COLUMN].to_numpy() if TRACK_COLUMN in columns else new_values[TRACK_COLUMN].to_numpy()
+    new_tracks = new_values[TRACK_COLUMN].to_numpy()
+    track_moved = old_tracks != new_tracks
+    reassigned = pd.DataFrame({
+        KEY_COLUMN: changed[KEY_COLUMN].to_numpy()[track_moved],
+        '原赛道': old_tracks[track_moved],
+        '新赛道': new_tracks[track_moved],
+    })
+
+    swings = pd.DataFrame(columns=[KEY_COLUMN, TRACK_COLUMN, '上期访问量', '本期访问量', '变化率(%)'])
+    if swing_column in columns:
+        old_visits = pd.to_numeric(old_values[swing_column], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+        new_visits = pd.to_numeric(new_values[swing_column], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change_pct = np.where(old_visits > 0, (new_visits - old_visits) / old_visits * 100, np.inf)
+        is_swing = (np.abs(change_pct) >= swing_threshold) & (np.abs(new_visits - old_visits) >= min_swing_visits)
+        swings = pd.DataFrame({
+            KEY_COLUMN: changed[KEY_COLUMN].to_numpy()[is_swing],
+            TRACK_COLUMN: new_tracks[is_swing],
+            '上期访问量': old_visits[is_swing],
+            '本期访问量': new_visits[is_swing],
+            '变化率(%)': np.round(change_pct[is_swing], 1),
+        }).sort_values('变化率(%)', key=np.abs, ascending=False, ignore_index=True)
+
+    snapshot_columns = [KEY_COLUMN, TRACK_COLUMN] + ([swing_column] if swing_column in new_df.columns else [])
+    added = new_df[snapshot_columns].iloc[added_rows].reset_index(drop=True)
+    removed = old_df[[col for col in snapshot_columns if col in old_df.columns]].iloc[removed_rows].reset_index(drop=True)
+
+    affected_tracks = set(added[TRACK_COLUMN]) | set(removed.get(TRACK_COLUMN, [])) | set(new_tracks) | set(old_tracks)
+    # 新一期中已没有工具的赛道，其分赛道文件需要删除
+    removed_tracks = set(old_df[TRACK_COLUMN].astype(str)) - set(new_df[TRACK_COLUMN].astype(str)) \
+        if TRACK_COLUMN in old_df.columns else set()
+
+    return {
+        'summary': {
+            '上期工具数': len(old_df),
+            '本期工具数': len(new_df),
+            '新增': len(added),
+            '下架': len(removed),
+            '内容变化': len(changed),
+            '赛道调整': len(reassigned),
+            '访问量大幅波动': len(swings),
+            '下架赛道': len(removed_tracks),
+        },
+        'added': added,
+        'removed': removed,
+        'changed': changed,
+        'reassigned': reassigned,
+        'swings': swings,
+        'affected_tracks': sorted(str(track) for track in affected_tracks),
+        'removed_tracks': sorted(removed_tracks),
+    }
+
+
+def save_diff(diff, path=DIFF_FILE, old_path=None, new_path=None):
+    """保存对比结果（表格以记录列表形式保存）"""
+    payload = {
+        '上期文件': old_path,
+        '本期文件': new_path,
+        '生成时间': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'summary': diff['summary'],
+        'affected_tracks': diff['affected_tracks'],
+        'removed_tracks': diff['removed_tracks'],
+    }
+    for key in ('added', 'removed', 'changed', 'reassigned', 'swings'):
+        payload[key] = diff[key].to_dict(orient='records')
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2, default=_json_default)
+
+
+def load_diff(path=DIFF_FILE):
+    """读取保存的对比结果，表格还原为DataFrame；文件不存在时返回None"""
+    if not os.path.exists(path):
+        return None
+
+    with open(path, 'r', encoding='utf-8') as f:
+        payload = json.load(f)
+    for key in ('added', 'removed', 'changed', 'reassigned', 'swings'):
+        payload[key] = pd.DataFrame(payload.get(key, []))
+    payload.setdefault('removed_tracks', [])
+    return payload
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="对比两期总表并保存变化")
+    parser.add_argument("old", help="上期总表")
+    parser.add_argument("new", nargs="?", default=SUMMARY_FILE, help="本期总表")
+    parser.add_argument("--output", default=DIFF_FILE, help="对比结果JSON路径")
+    parser.add_argument("--rebuild-tracks", metavar="OUTPUT_DIR", default=None,
+                        help="只为受影响的赛道重新生成分赛道文件")
+    parser.add_argument("--format", dest="side_formats", action="append", choices=["csv", "parquet"], default=[],
+                        help="重新生成时额外输出的副本格式")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    start = time.perf_counter()
+    diff = diff_snapshots(pd.read_excel(args.old), pd.read_excel(args.new))
+    save_diff(diff, args.output, args.old, args.new)
+    print(f"对比完成，耗时 {time.perf_counter() - start:.2f}s，结果已保存到 {args.output}")
+    for key, value in diff['summary'].items():
+        print(f"  {key}: {value:,}")
+    print(f"  受影响赛道: {', '.join(diff['affected_tracks']) or '无'}")
+    print(f"  下架赛道: {', '.join(diff['removed_tracks']) or '无'}")
+
+    if args.rebuild_tracks:
+        if diff['affected_tracks']:
+            generate_track_excel_files(args.new, args.rebuild_tracks, side_formats=args.side_formats,
+                                       tracks=diff['affected_tracks'])
+        # 下架赛道的Excel、副本和 .summary.json 不再由新一期生成，删除以免继续计入赛道总和
+        for path in remove_track_files(args.rebuild_tracks, diff['removed_tracks']):
+            print(f"🗑️ 已删除: {path}")
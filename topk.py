@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式分组TOP K
+
+每个分组（赛道）每个排序字段维护一个容量为K的最小堆，逐批推入候选行，
+内存上限为 K × 分组数 × 排序字段数，不需要整组数据驻留内存。
+堆元素为 (值, -行号, 记录)：值相同时行号小者优先，与 DataFrame.nlargest(keep='first')
+的结果一致。状态可以按数据源顺序合并，便于分片/多进程聚合后汇总。
+"""
+
+import heapq
+
+import numpy as np
+
+# 详情页TOP 10表格和TOP 15双轴图共用
+TOPK_SIZE = 15
+
+
+def new_topk(columns, k=TOPK_SIZE):
+    """创建空的TOP K状态：columns为排序字段"""
+    return {'k': k, 'heaps': {column: {} for column in columns}}
+
+
+def _push(heap, k, entry):
+    if len(heap) < k:
+        heapq.heappush(heap, entry)
+    elif entry > heap[0]:
+        heapq.heapreplace(heap, entry)
+
+
+def update_topk(state, group_codes, group_names, scores, row_ids, records):
+    """推入一批行
+
+    Args:
+        group_codes: 每行的分组编码（pd.factorize 的结果）
+        group_names: 编码对应的分组名
+        scores: {排序字段: 每行的值}，NaN不参与排名
+        row_ids: 每行在数据源中的全局行号，用于同值时的先后
+        records: 每行的记录（元组），随堆元素保存
+    """
+    k = state['k']
+    group_codes = np.asarray(group_codes)
+    row_ids = np.asarray(row_ids)
+
+    for column, heaps in state['heaps'].items():
+        values = np.asarray(scores[column], dtype=np.float64)
+        valid = np.flatnonzero(~np.isnan(values))
+        if valid.size == 0:
+            continue
+
+        # 批内先按 (分组, 值降序, 行号升序) 排序，每组只有前K行可能进入堆
+        order = valid[np.lexsort((row_ids[valid], -values[valid], group_codes[valid]))]
+        codes = group_codes[order]
+        group_start = np.r_[0, np.flatnonzero(codes[1:] != codes[:-1]) + 1]
+        position = np.arange(len(order)) - np.repeat(group_start, np.diff(np.r_[group_start, len(order)]))
+        candidates = order[position < k]
+
+        for i in candidates:
+            heap = heaps.setdefault(group_names[group_codes[i]], [])
+            _push(heap, k, (float(values[i]), -int(row_ids[i]), records[i]))
+
+    return state
+
+
+def merge_topk(states, row_offsets=None):
+    """按数据源顺序合并多个TOP K状态，row_offsets为各状态行号需要加上的偏移"""
+    states = list(states)
+    if row_offsets is None:
+        row_offsets = [0] * len(states)
+
+    merged = new_topk(states[0]['heaps'].keys(), states[0]['k']) if states else new_topk(())
+    for state, offset in zip(states, row_offsets):
+        for column, heaps in state['heaps'].items():
+            merged_heaps = merged['heaps'].setdefault(column, {})
+            for group, heap in heaps.items():
+                target = merged_heaps.setdefault(group, [])
+                for value, neg_row_id, record in heap:
+                    _push(target, merged['k'], (value, neg_row_id - offset, record))
+    return merged
+
+
+def topk_records(state, column, group, top_n=None):
+    """返回分组内按排序字段降序的记录列表（同值时行号小者在前）"""
+    heap = state['heaps'].get(column, {}).get(group, [])
+    ranked = sorted(heap, reverse=True)
+    if top_n is not None:
+        ranked = ranked[:top_n]
+    return [record for _, _, record in ranked]
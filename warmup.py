@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动预热
+
+在服务启动时于后台线程导入重型依赖，并预先填充数据、聚合和图表缓存，
+首个真实请求即可直接命中缓存。预热过程的耗时记录在启动报告中。
+"""
+
+import importlib
+import threading
+import time
+
+import memory_diagnostics
+
+# 首屏之后才需要的重型依赖
+HEAVY_MODULES = ["pandas", "numpy", "plotly.graph_objects", "plotly.express", "plotly.subplots"]
+
+_startup_report = {}
+_report_lock = threading.Lock()
+
+
+def get_startup_report():
+    """返回启动报告的副本；未通过 serve.py 启动时为空字典"""
+    with _report_lock:
+        if not _startup_report:
+            return {}
+        report = dict(_startup_report)
+        report['明细'] = list(_startup_report['明细'])
+        return report
+
+
+def _record(stage, name, seconds):
+    """记录一个预热步骤的耗时"""
+    with _report_lock:
+        _startup_report['明细'].append({'阶段': stage, '项目': name, '耗时(秒)': round(seconds, 3)})
+        _startup_report[f'{stage}耗时(秒)'] += seconds
+
+
+def _timed(stage, name, func, *args):
+    """执行并记录一个预热步骤"""
+    start = time.perf_counter()
+    result = func(*args)
+    _record(stage, name, time.perf_counter() - start)
+    return result
+
+
+def warm_caches():
+    """导入重型依赖并预热数据、聚合和图表缓存"""
+    with _report_lock:
+        _startup_report.update({'状态': '进行中', '导入耗时(秒)': 0.0, '预热耗时(秒)': 0.0, '明细': []})
+
+    try:
+        for module_name in HEAVY_MODULES:
+            _timed('导入', module_name, importlib.import_module, module_name)
+
+        # 导入放在这里，使上面的导入计时反映真实的冷启动开销
+        import aggregates
+        import charts
+        import data_loader
+        import filter_index
+        import rank_index
+        import similarity
+
+        df = _timed('预热', '总表数据', data_loader.load_summary_data)
+        _timed('预热', '赛道总和数据', data_loader.load_track_summaries)
+        _timed('预热', '总览指标', aggregates.get_overall_metrics)
+        _timed('预热', '赛道概览表', aggregates.get_track_overview)
+        _timed('预热', 'MoM矩阵', aggregates.get_mom_matrix)
+        _timed('预热', '排名索引', rank_index.get_rank_index)
+        _timed('预热', '筛选索引', filter_index.get_filter_index)
+        _timed('预热', '相似度索引', similarity.get_similarity_index)
+        _timed('预热', 'MoM热力图', charts.get_mom_heatmap)
+        _timed('预热', '增长率分布图', charts.get_growth_distribution_chart)
+
+        for track_name in aggregates.KEY_TRACKS + aggregates.get_other_tracks(df):
+            _timed('预热', f'{track_name} 指标', aggregates.get_track_metrics, track_name)
+            _timed('预热', f'{track_name} TOP 10', aggregates.get_top_tools_table, track_name, 10)
+            _timed('预热', f'{track_name} 图表', charts.get_track_figures, track_name)
+
+        status = '完成'
+    except Exception as e:
+        status = f'失败: {e}'
+
+    with _report_lock:
+        _startup_report['状态'] = status
+
+    print_startup_report()
+
+
+def _warm_in_background():
+    """后台预热期间的内存变化不计入会话的内存诊断"""
+    with memory_diagnostics.background_activity():
+        warm_caches()
+
+
+def start_background_warmup():
+    """在后台守护线程中预热，不阻塞服务启动"""
+    thread = threading.Thread(target=_warm_in_background, name="cache-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def print_startup_report():
+    """打印启动报告"""
+    report = get_startup_report()
+    if not report:
+        return
+
+    print(f"启动预热{report['状态']}：导入耗时 {report['导入耗时(秒)']:.3f}s，预热耗时 {report['预热耗时(秒)']:.3f}s")
+    for record in report['明细']:
+        print(f"  [{record['阶段']}] {record['项目']}: {record['耗时(秒)']:.3f}s")